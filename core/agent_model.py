@@ -1,4 +1,9 @@
+import functools
 import random
+from core.movement import propose_moves, resolve_moves
+
+# odległość (w pikselach), z której jeleń wyczuwa watahę; liczba pól zależy od rozmiaru pola siatki
+DEER_ALERT_DISTANCE = 60
 
 
 class WolfPack:
@@ -12,9 +17,10 @@ class WolfPack:
         self.y = y
         self.wolf_count = wolf_count
 
-    def move(self, deer_positions, occupied_positions, rows, cols):
+    def move(self, deer_positions, occupied_positions, rows, cols, terrain=None):
         """
         Przesuwa watahę w kierunku jelenia lub losowo, jeśli jelenie nie są dostępne.
+        Przy podanym terenie losowe ruchy preferują pola o lepszej przydatności siedliska.
         """
         nearest_deer = None
 
@@ -33,8 +39,7 @@ class WolfPack:
                 occupied_positions[nearest_deer] = occupied_positions.get(nearest_deer, 0) + 1
                 return new_x, new_y
 
-        possible_moves = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
-        random.shuffle(possible_moves)
+        possible_moves = self.random_moves(terrain)
 
         for dx, dy in possible_moves:
             new_x, new_y = self.x + dx, self.y + dy
@@ -43,16 +48,53 @@ class WolfPack:
 
         return self.x, self.y
 
+    def random_moves(self, terrain=None, rng=random):
+        """
+        Zwraca możliwe kroki na sąsiednie pola w losowej kolejności (ważonej terenem, jeśli podano).
+        """
+        possible_moves = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+        if terrain is not None:
+            return terrain.preference_order(possible_moves, self.x, self.y, rng)
+        rng.shuffle(possible_moves)
+        return possible_moves
+
+    def propose_moves(self, deer_positions, rows, cols, terrain=None, rng=random):
+        """
+        Zwraca możliwe ruchy watahy w kolejności preferencji, nie zmieniając stanu modelu:
+        najpierw kroki w kierunku kolejnych najbliższych jeleni, potem losowe pola sąsiednie,
+        a na końcu pozostanie w miejscu.
+        """
+        options = []
+
+        for deer in sorted(deer_positions, key=lambda d: abs(d[0] - self.x) + abs(d[1] - self.y)):
+            dx = 1 if deer[0] > self.x else -1 if deer[0] < self.x else 0
+            dy = 1 if deer[1] > self.y else -1 if deer[1] < self.y else 0
+            options.append(((self.x + dx, self.y + dy), deer))
+
+        for dx, dy in self.random_moves(terrain, rng):
+            new_x, new_y = self.x + dx, self.y + dy
+            if 0 <= new_x < cols and 0 <= new_y < rows:
+                options.append(((new_x, new_y), None))
+
+        options.append(((self.x, self.y), None))
+        return options
+
 
 class WolfModel:
     """
     Model agentowy zarządzający watahami wilków.
+    W trybie synchronicznym wszystkie watahy proponują ruchy na podstawie tego samego stanu,
+    a konflikty rozstrzygane są osobno w losowej kolejności (opcjonalnie z użyciem executora).
     """
-    def __init__(self, wolf_count, cols, rows):
+    def __init__(self, wolf_count, cols, rows, synchronous=False, executor=None, terrain=None):
         self.cols = cols
         self.rows = rows
+        self.synchronous = synchronous
+        self.executor = executor
+        self.terrain = terrain
         self.grid = {}
         self.schedule = self.init_agents(wolf_count)
+        self.next_id = len(self.schedule)
 
     def init_agents(self, wolf_count):
         """
@@ -82,8 +124,9 @@ class WolfModel:
                 new_pack = agent.wolf_count - pack_half
                 agent.wolf_count = pack_half
 
-                new_id = len(self.schedule) + len(new_agents)
-                new_agent = WolfPack(new_id, agent.x, agent.y, new_pack)
+                # identyfikatory nie są używane ponownie po usunięciu watahy
+                new_agent = WolfPack(self.next_id, agent.x, agent.y, new_pack)
+                self.next_id += 1
                 new_agents.append(new_agent)
 
         self.schedule.extend(new_agents)
@@ -92,13 +135,19 @@ class WolfModel:
         """
         Iteruje przez wszystkich agentów i przesuwa ich, aktualizując pozycje.
         """
-        occupied_positions = {}
-        new_positions = {}
+        if self.synchronous:
+            propose = functools.partial(WolfPack.propose_moves, deer_positions=deer_positions,
+                                        rows=self.rows, cols=self.cols, terrain=self.terrain)
+            proposals = propose_moves(self.schedule, propose, self.executor)
+            new_positions = dict(zip(self.schedule, resolve_moves(proposals)))
+        else:
+            occupied_positions = {}
+            new_positions = {}
 
-        for agent in self.schedule:
-            new_x, new_y = agent.move(deer_positions, occupied_positions, self.rows, self.cols)
-            occupied_positions[(new_x, new_y)] = occupied_positions.get((new_x, new_y), 0) + 1
-            new_positions[agent] = (new_x, new_y)
+            for agent in self.schedule:
+                new_x, new_y = agent.move(deer_positions, occupied_positions, self.rows, self.cols, self.terrain)
+                occupied_positions[(new_x, new_y)] = occupied_positions.get((new_x, new_y), 0) + 1
+                new_positions[agent] = (new_x, new_y)
 
         for agent, (new_x, new_y) in new_positions.items():
             agent.x, agent.y = new_x, new_y
@@ -116,37 +165,52 @@ class DeerHabitats:
     Model odpowiadający za siedliska jeleni.
     Przechowuje informacje o pozycjach jeleni i zarządza ich ruchem oraz populacją.
     """
-    def __init__(self, count, cols, rows, grid_size=20):
+    def __init__(self, count, cols, rows, grid_size=20, synchronous=False, executor=None, terrain=None):
         self.cols = cols
         self.rows = rows
         self.grid_size = grid_size
+        self.synchronous = synchronous
+        self.executor = executor
+        self.terrain = terrain
         self.deer_count = 35
         self.habitats = self.generate_deer_habitats(count)
 
+    def __getstate__(self):
+        # executor nie jest przekazywany do procesów liczących propozycje ruchów
+        state = self.__dict__.copy()
+        state["executor"] = None
+        return state
+
     def generate_deer_habitats(self, count):
         """
         Generuje losowe pozycje siedlisk jeleni na siatce.
         """
         deer_habitats = []
         while len(deer_habitats) < count:
-            x, y = random.randint(0, self.cols - 1), random.randint(0, self.rows - 1)
-            deer_habitats.append((x, y))
+            deer_habitats.append(self.random_position())
         return deer_habitats
 
+    def random_position(self):
+        """
+        Losuje pozycję siedliska - równomiernie lub proporcjonalnie do przydatności terenu.
+        """
+        if self.terrain is not None:
+            return self.terrain.random_cell()
+        return random.randint(0, self.cols - 1), random.randint(0, self.rows - 1)
+
     def get_habitats(self):
         """
         Zwraca listę aktualnych pozycji jeleni.
         """
         return self.habitats
 
-    def move(self, x, y, wolf_positions):
+    def move(self, x, y, wolf_positions, rng=random):
         """
         Przesuwa jelenia w zależności od pozycji wilków i aktualnej pozycji.
+        Przy podanym terenie ucieczka preferuje lepsze siedliska, a jeleń bez zagrożenia
+        podąża za polem przepływu w kierunku lepszego siedliska.
         """
-        if self.grid_size == 20:
-            d = 3
-        else:
-            d = 1
+        d = max(1, DEER_ALERT_DISTANCE // self.grid_size)
 
         nearby_wolves = [(wx, wy) for wx, wy in wolf_positions if abs(wx - x) <= d and abs(wy - y) <= d]
 
@@ -158,22 +222,39 @@ class DeerHabitats:
             possible_moves = [(3, 0), (-3, 0), (0, 3), (0, -3), (3, 3), (3, -3), (-3, 3), (-3, -3)]
             safe_moves = [(mx, my) for mx, my in possible_moves if mx * dx <= 0 or my * dy <= 0]
 
-            if safe_moves:
-                move = random.choice(safe_moves)
+            candidates = safe_moves or possible_moves
+            if self.terrain is not None:
+                move = self.terrain.preference_order(candidates, x, y, rng)[0]
             else:
-                move = random.choice(possible_moves)
+                move = rng.choice(candidates)
 
             new_x = max(0, min(self.cols - 1, x + move[0]))
             new_y = max(0, min(self.rows - 1, y + move[1]))
+        elif self.terrain is not None:
+            dx, dy = self.terrain.flow_at(x, y)
+            new_x = max(0, min(self.cols - 1, x + dx))
+            new_y = max(0, min(self.rows - 1, y + dy))
         else:
             new_x, new_y = x, y
 
         return new_x, new_y
 
+    def propose_moves(self, position, wolf_positions, rng=random):
+        """
+        Zwraca ruch jelenia jako jedyną (zawsze przyjmowaną) opcję dla rozstrzygania konfliktów.
+        """
+        return [(self.move(position[0], position[1], wolf_positions, rng), None)]
+
     def step(self, wolf_positions):
         """
         Iteruje przez wszystkie jelenie i aktualizuje ich pozycje.
         """
+        if self.synchronous:
+            propose = functools.partial(self.propose_moves, wolf_positions=wolf_positions)
+            proposals = propose_moves(self.habitats, propose, self.executor)
+            self.habitats = resolve_moves(proposals)
+            return
+
         new_habitats = []
         for x, y in self.habitats:
             new_x, new_y = self.move(x, y, wolf_positions)
@@ -190,8 +271,7 @@ class DeerHabitats:
         if current_deer_count < self.deer_count:
             deer_to_add = self.deer_count - current_deer_count
             for _ in range(deer_to_add):
-                x, y = random.randint(0, self.cols - 1), random.randint(0, self.rows - 1)
-                self.habitats.append((x, y))
+                self.habitats.append(self.random_position())
         elif current_deer_count > self.deer_count:
             deer_to_remove = current_deer_count - self.deer_count
             self.habitats = self.habitats[:-deer_to_remove]
@@ -0,0 +1,157 @@
+import glob
+import hashlib
+import json
+import os
+from core.runner import run_headless
+from core.terrain import Terrain, terrain_key
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "wolf_simulation")
+
+# moduły, których zmiana unieważnia zapisane wyniki (cały pakiet core, z którego korzysta runner)
+MODEL_FILES = os.path.join(os.path.dirname(__file__), "*.py")
+
+_model_version = None
+
+
+def model_version():
+    """
+    Zwraca skrót kodu modelu; wyniki policzone starszą wersją modelu nie są odczytywane.
+    """
+    global _model_version
+    if _model_version is None:
+        digest = hashlib.sha256()
+        for path in sorted(glob.glob(MODEL_FILES)):
+            digest.update(os.path.basename(path).encode())
+            with open(path, "rb") as file:
+                digest.update(file.read())
+        _model_version = digest.hexdigest()
+    return _model_version
+
+
+def terrain_id(terrain, grid_size):
+    """
+    Zwraca identyfikator terenu przebiegu: klucz podanego obiektu Terrain, klucz domyślnej mapy
+    dla terrain=True lub None dla przebiegu bez terenu.
+    """
+    if isinstance(terrain, Terrain):
+        return terrain.key
+    return terrain_key(900 // grid_size, 500 // grid_size) if terrain else None
+
+
+def result_key(params, end_year, seed, steps_per_year=72, grid_size=20, terrain=True,
+               movement_substeps=1, demography_interval=None, kind="summary"):
+    """
+    Tworzy klucz wyniku na podstawie pełnego zestawu parametrów, ziarna, terenu,
+    harmonogramu kroków i wersji modelu. kind rozróżnia rodzaje wyników dla tego samego przebiegu
+    (podsumowanie run_cached, przebieg repliki zespołu, przedział z zespołu).
+    """
+    description = {
+        "kind": kind,
+        "params": {name: float(value) for name, value in (params or {}).items()},
+        "end_year": end_year,
+        "seed": seed,
+        "steps_per_year": steps_per_year,
+        "grid_size": grid_size,
+        "movement_substeps": movement_substeps,
+        "demography_interval": demography_interval,
+        "terrain": terrain_id(terrain, grid_size),
+        "model": model_version(),
+    }
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Pamięć podręczna podsumowań przebiegów zapisywana na dysku.
+    Każdy wynik to plik JSON nazwany kluczem; czas modyfikacji pliku służy jako
+    czas ostatniego użycia, a po przekroczeniu max_bytes usuwane są najdawniej używane wyniki.
+    """
+    def __init__(self, directory=CACHE_DIR, max_bytes=50 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """
+        Zwraca zapisane podsumowanie lub None, jeśli wyniku nie ma w pamięci podręcznej.
+        """
+        path = self.path(key)
+        try:
+            with open(path) as file:
+                summary = json.load(file)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return summary
+
+    def put(self, key, summary):
+        """
+        Zapisuje podsumowanie i usuwa najdawniej używane wyniki, jeśli przekroczono limit rozmiaru.
+        """
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(summary, file)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total_size = 0
+        with os.scandir(self.directory) as files:
+            for entry in files:
+                if not entry.name.endswith(".json"):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_size += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+
+
+def open_cache(cache):
+    """
+    Zwraca pamięć podręczną dla argumentu cache: True - domyślny ResultCache, False lub None - brak,
+    obiekt ResultCache - bez zmian.
+    """
+    if cache is True:
+        return ResultCache()
+    return cache or None
+
+
+def run_cached(params=None, end_year=2020, seed=0, steps_per_year=72, grid_size=20, cache=None, terrain=True,
+               movement_substeps=1, demography_interval=None, on_year=None):
+    """
+    Zwraca podsumowanie przebiegu z pamięci podręcznej lub uruchamia symulację i zapisuje wynik.
+    on_year działa jak w HeadlessSimulation.run; dla wyniku z pamięci podręcznej jest wywoływane
+    z zapisanych lat. Przebieg przerwany przez on_year nie jest zapisywany.
+    """
+    schedule = {"movement_substeps": movement_substeps, "demography_interval": demography_interval}
+    # przebiegi bez ziarna i na terenie bez klucza (np. Terrain z własnych warstw) nie są zapisywane
+    if seed is None or (isinstance(terrain, Terrain) and terrain.key is None):
+        return run_headless(params, end_year, seed, steps_per_year, grid_size, on_year, terrain, **schedule)
+
+    cache = cache or ResultCache()
+    key = result_key(params, end_year, seed, steps_per_year, grid_size, terrain, **schedule)
+    summary = cache.get(key)
+    if summary is None:
+        summary = run_headless(params, end_year, seed, steps_per_year, grid_size, on_year, terrain, **schedule)
+        if summary["years"][-1] >= end_year:
+            cache.put(key, summary)
+    elif on_year is not None:
+        for i in range(1, len(summary["years"])):
+            if on_year(summary["years"][i], summary["wolves"][i], summary["killed"][i]) is False:
+                summary = {name: values[:i + 1] for name, values in summary.items()}
+                break
+    return summary
+
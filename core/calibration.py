@@ -0,0 +1,168 @@
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from core.math_model import PopulationModel
+from core.cache import open_cache, result_key
+from core.runner import run_headless
+
+# domyślne zakresy przeszukiwania mnożników urodzeń i śmiertelności
+DEFAULT_BOUNDS = {
+    "birth_rate": (0.5, 1.5),
+    "death_rate": (0.5, 1.5),
+}
+
+
+def logistic_curve(years, p0, growth_rate, k, t0=2000):
+    """
+    Analityczne rozwiązanie modelu logistycznego.
+    Argumenty growth_rate i k mogą być tablicami - wynik ma wtedy kształt (kandydaci, lata).
+    """
+    t = np.asarray(years, dtype=float) - t0
+    r = np.asarray(growth_rate, dtype=float)[..., None]
+    k = np.asarray(k, dtype=float)[..., None]
+    return k / (1 + (k - p0) / p0 * np.exp(-r * t))
+
+
+def mse_loss(simulated, observed):
+    """
+    Średni błąd kwadratowy liczony wzdłuż ostatniej osi (po latach obserwacji).
+    """
+    simulated = np.asarray(simulated, dtype=float)
+    observed = np.asarray(observed, dtype=float)
+    return np.mean((simulated - observed) ** 2, axis=-1)
+
+
+def fit_logistic(years, avg_pop, growth_rates=None, capacities=None):
+    """
+    Dopasowuje r i K modelu logistycznego do całej serii obserwacji.
+    Wszystkie pary (r, K) z siatki oceniane są jednocześnie (wektorowo).
+    """
+    if growth_rates is None:
+        growth_rates = np.linspace(0.01, 3.0, 300)
+    if capacities is None:
+        capacities = np.arange(max(avg_pop), 2 * max(avg_pop) + 1)
+
+    r_grid, k_grid = np.meshgrid(growth_rates, capacities, indexing="ij")
+    curves = logistic_curve(years, avg_pop[0], r_grid.ravel(), k_grid.ravel(), years[0])
+    losses = mse_loss(curves, avg_pop)
+
+    best = int(np.argmin(losses))
+    return float(r_grid.ravel()[best]), float(k_grid.ravel()[best]), float(losses[best])
+
+
+def evaluate_candidate(candidate, seeds, years, avg_pop, threshold=None, steps_per_year=72, cache=None):
+    """
+    Uruchamia zespół przebiegów modelu agentowego dla jednego kandydata i zwraca jego średni błąd.
+    Błąd kwadratowy rośnie monotonicznie z każdym rokiem, więc gdy dolne ograniczenie
+    średniej po zespole przekroczy threshold, kandydat jest odrzucany (zwraca inf).
+    Przebiegi zapisane w cache (ResultCache) nie są liczone ponownie.
+    """
+    observed = dict(zip(years, avg_pop))
+    end_year = max(years)
+    simulated = np.zeros((len(seeds), len(years)))
+    bound = threshold * len(years) * len(seeds) if threshold is not None else None
+    finished_error = 0.0
+
+    for i, seed in enumerate(seeds):
+        key = result_key(candidate, end_year, seed, steps_per_year) if cache is not None else None
+        summary = cache.get(key) if cache is not None else None
+
+        if summary is None:
+            partial_error = [0.0]
+
+            def on_year(year, wolves, killed):
+                if year in observed:
+                    partial_error[0] += (wolves - observed[year]) ** 2
+                return bound is None or finished_error + partial_error[0] <= bound
+
+            summary = run_headless(candidate, end_year, seed, steps_per_year, on_year=on_year)
+            if summary["years"][-1] < end_year:
+                return float("inf")
+            if cache is not None:
+                cache.put(key, summary)
+
+        by_year = dict(zip(summary["years"], summary["wolves"]))
+        simulated[i] = [by_year[year] for year in years]
+        finished_error = float(np.sum((simulated[:i + 1] - avg_pop) ** 2))
+        if bound is not None and finished_error > bound:
+            return float("inf")
+
+    return float(np.mean(mse_loss(simulated, avg_pop)))
+
+
+def sample_candidates(bounds, count, seed=None):
+    """
+    Losuje kandydatów równomiernie z podanych zakresów.
+    """
+    rng = np.random.default_rng(seed)
+    names = sorted(bounds)
+    low = np.array([bounds[name][0] for name in names])
+    high = np.array([bounds[name][1] for name in names])
+    samples = rng.uniform(low, high, size=(count, len(names)))
+    return [{name: round(float(value), 3) for name, value in zip(names, row)} for row in samples]
+
+
+def calibrate(candidates=32, replicas=4, bounds=None, workers=None, tolerance=2.0, seed=None, steps_per_year=72,
+              cache=True):
+    """
+    Kalibruje model względem obserwacji avg_pop.
+    Mnożniki urodzeń i śmiertelności (params) dobierane są na podstawie zespołów przebiegów
+    modelu agentowego, oceniając kandydatów równolegle w puli procesów; kandydaci gorsi
+    od najlepszego o więcej niż tolerance razy są przerywani wcześniej.
+    r i K (growth_rate, carrying_capacity) pochodzą wyłącznie z dopasowania krzywej logistycznej:
+    w latach 2000-2020 model agentowy korzysta z interpolowanych danych, więc przebiegi zespołu
+    nie zależą od r, a K działa w nich tylko jako próg śmiertelności.
+    Przebiegi są zapisywane w pamięci podręcznej (domyślnie ResultCache(), można podać własną
+    lub wyłączyć ją przez cache=False), więc powtórzone kalibracje nie liczą ich ponownie.
+    """
+    cache = open_cache(cache)
+    model = PopulationModel()
+    years, avg_pop = list(model.years), list(model.avg_pop)
+    growth_rate, carrying_capacity, logistic_loss = fit_logistic(years, avg_pop)
+
+    rng = random.Random(seed)
+    seeds = [rng.randrange(2 ** 32) for _ in range(replicas)]
+    pending = sample_candidates(bounds or DEFAULT_BOUNDS, candidates, seed)
+
+    best_candidate, best_loss = None, float("inf")
+    results = []
+    batch_size = workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            threshold = best_loss * tolerance if best_candidate is not None else None
+            futures = [
+                executor.submit(
+                    evaluate_candidate, candidate, seeds, years, avg_pop, threshold, steps_per_year, cache
+                )
+                for candidate in batch
+            ]
+            for candidate, future in zip(batch, futures):
+                loss = future.result()
+                results.append((candidate, loss))
+                if loss < best_loss:
+                    best_candidate, best_loss = candidate, loss
+
+    return {
+        "params": best_candidate,
+        "loss": best_loss,
+        "growth_rate": growth_rate,
+        "carrying_capacity": carrying_capacity,
+        "logistic_loss": logistic_loss,
+        "results": results,
+    }
+
+
+def apply_calibration(population_model, params, growth_rate=None):
+    """
+    Ustawia w PopulationModel mnożniki znalezione przez kalibrację oraz opcjonalnie
+    dopasowane tempo wzrostu (wpływa tylko na prognozę po 2020 roku).
+    K z dopasowania krzywej nie jest ustawiane, ponieważ w latach 2000-2020 zmieniłoby
+    próg śmiertelności, którego zespoły przebiegów nie oceniały.
+    """
+    for name, value in params.items():
+        setattr(population_model, name, value)
+    if growth_rate is not None:
+        population_model.growth_rate = growth_rate
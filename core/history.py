@@ -0,0 +1,82 @@
+import csv
+from collections import deque
+
+# kolumny pliku z rocznymi agregatami
+COLUMNS = ("first_year", "last_year", "wolves_mean", "wolves_min", "wolves_max", "killed")
+
+
+class History:
+    """
+    Historia przebiegu o stałym rozmiarze w pamięci.
+    Ostatnie kroki trzymane są w buforze cyklicznym (recent_steps), a roczne agregaty
+    liczby wilków są uśredniane w blokach po downsample lat i dopisywane do pliku CSV.
+    """
+    def __init__(self, path=None, recent_steps=72 * 10, downsample=1):
+        self.path = path
+        self.downsample = downsample
+        self.recent = deque(maxlen=recent_steps)
+        self.years_written = 0
+        self.block = None
+        self.year_stats = None
+
+        self.file = None
+        self.writer = None
+        if path is not None:
+            self.file = open(path, "w", newline="")
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(COLUMNS)
+
+    def add_step(self, year, step, wolves, killed):
+        """
+        Dodaje stan po kroku symulacji.
+        """
+        self.recent.append((year, step, wolves, killed))
+
+        if self.year_stats is None:
+            self.year_stats = [year, 0, 0, wolves, wolves]
+        stats = self.year_stats
+        stats[1] += 1
+        stats[2] += wolves
+        stats[3] = min(stats[3], wolves)
+        stats[4] = max(stats[4], wolves)
+
+    def end_year(self, killed):
+        """
+        Zamyka bieżący rok i, po zebraniu downsample lat, zapisuje jeden wiersz agregatów.
+        """
+        if self.year_stats is None:
+            return
+        year, steps, total, low, high = self.year_stats
+        self.year_stats = None
+
+        if self.block is None:
+            self.block = [year, year, 0, 0, low, high, killed]
+        block = self.block
+        block[1] = year
+        block[2] += steps
+        block[3] += total
+        block[4] = min(block[4], low)
+        block[5] = max(block[5], high)
+        block[6] = killed
+
+        if block[1] - block[0] + 1 >= self.downsample:
+            self.flush_block()
+
+    def flush_block(self):
+        if self.block is None:
+            return
+        first_year, last_year, steps, total, low, high, killed = self.block
+        self.block = None
+        self.years_written += last_year - first_year + 1
+        if self.writer is not None:
+            self.writer.writerow((first_year, last_year, round(total / steps, 2), low, high, killed))
+            self.file.flush()
+
+    def close(self):
+        """
+        Zapisuje niepełny blok i zamyka plik.
+        """
+        self.flush_block()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
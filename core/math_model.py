@@ -1,8 +1,32 @@
 import random
 import math
+import functools
 import numpy as np
 
 
+@functools.lru_cache(maxsize=32)
+def logistic_trajectory(base_population, growth_rate, k, horizon):
+    """
+    Zwraca tablicę populacji dla lat 2000-horizon (indeks 0 to rok 2000).
+    Lata 2000-2020 pochodzą z danych, kolejne z analitycznego rozwiązania
+    modelu logistycznego startującego od populacji w 2020 roku.
+    Wynik jest zapamiętywany i współdzielony, dlatego zwracana jest krotka.
+    """
+    trajectory = list(base_population)
+    p0 = base_population[-1]
+    last_year = 2000 + len(base_population) - 1
+
+    for year in range(last_year + 1, horizon + 1):
+        if p0 >= k:
+            predicted_population = k
+        else:
+            t = year - last_year
+            predicted_population = k / (1 + (k - p0) / p0 * math.exp(-growth_rate * t))
+        trajectory.append(round(predicted_population))
+
+    return tuple(trajectory)
+
+
 class PopulationModel:
     """
     Klasa odpowiedzialna za modelowanie dynamiki populacji wilków na przestrzeni lat.
@@ -20,6 +44,10 @@ class PopulationModel:
         self.food_access = 1.0
         self.hunting = 1
         self.steps_in_year = 72
+        self.carrying_capacity = 150
+        self.trajectory_horizon = 2100
+        self.trajectory = None
+        self.trajectory_key = None
 
         self.calculate_annual_changes()
         self.population = self.calculate_population(self.avg_pop[0])
@@ -72,26 +100,27 @@ class PopulationModel:
 
     def predict_for_next_year(self, year):
         """
-        Oblicza przyszlą populację na podstawie logistycznego modelu populacji.
+        Zwraca przewidywaną populację na dany rok na podstawie logistycznego modelu populacji.
+        """
+        return self.get_trajectory(year)[year - 2000]
+
+    def get_trajectory(self, horizon=None):
+        """
+        Zwraca zapamiętaną tablicę populacji od 2000 roku co najmniej do roku horizon.
+        Horyzont jest podwajany w razie potrzeby, więc kolejne odczyty są O(1).
         """
         if self.growth_rate is None:
             self.growth_rate = self.calculate_growth_rate(self.avg_pop, self.years)
-        k = 150
-        r = self.growth_rate
 
-        # current_population = sum(agent.wolf_count for agent in model.schedule)
-        current_population = self.population[-1]
+        if horizon is not None:
+            while self.trajectory_horizon < horizon:
+                self.trajectory_horizon = 2000 + 2 * (self.trajectory_horizon - 2000)
 
-        if current_population >= k:
-            predicted_population = k
-            print(f"Population capped at 150 for {year}.")
-        else:
-            predicted_population = current_population + r * current_population * (1 - current_population / k)
-            print(f"Predicted population for {year}: {predicted_population}")
-
-        self.years.append(year)
-        self.population.append(round(predicted_population))
-        self.annual_changes.append(round(predicted_population - current_population))
+        key = (float(self.growth_rate), self.carrying_capacity, self.trajectory_horizon)
+        if key != self.trajectory_key:
+            self.trajectory = logistic_trajectory(tuple(self.population), *key)
+            self.trajectory_key = key
+        return self.trajectory
 
     def count_wolves(self, model):
         """
@@ -102,17 +131,9 @@ class PopulationModel:
 
     def get_new_population(self, year):
         """
-        Zwraca populację na dany rok.
+        Zwraca populację docelową w trakcie danego roku (populację na jego koniec).
         """
-        year = year - 2000
-        if year in range(20):
-            new_population = self.population[year + 1]
-        else:
-            if len(self.population) < year:
-                self.predict_for_next_year(self.years[-1] + 1)
-            new_population = self.population[-1]
-
-        return new_population
+        return self.get_trajectory(year + 1)[year - 2000 + 1]
 
     def get_hunting_influence(self, population):
         """
@@ -128,6 +149,12 @@ class PopulationModel:
             killed_wolves = math.ceil(population - altered_population)
         return altered_population, killed_wolves
 
+    def hunting_kills(self, year):
+        """
+        Zwraca liczbę wilków zabitych w danym kroku (jak update_population, ale bez zmiany populacji).
+        """
+        return self.get_hunting_influence(self.get_new_population(year))[1]
+
     def update_population(self, model, year, step):
         """
         Aktualizuje liczbę wilków na siatce.
@@ -147,14 +174,12 @@ class PopulationModel:
         delta = self.calculate_delta(model, new_population * total_wolves)
         # print(f"DELTA: {delta}")
 
-        birth_time = self.steps_in_year // 12 * 4
-        if step in range(birth_time - 1, birth_time + 1):
+        if self.is_birth_time(step):
             print("birth time")
             self.handle_births(model, delta)
 
-        death_start, death_end = self.steps_in_year // 12 * 11, self.steps_in_year // 12 * 2
-        if step >= death_start or step <= death_end:
-            if wolf_count < 150 or self.death_rate > 1:
+        if self.is_death_time(step):
+            if wolf_count < self.carrying_capacity or self.death_rate > 1:
                 delta = delta * self.death_rate
             self.handle_deaths(model, delta)
 
@@ -162,6 +187,20 @@ class PopulationModel:
 
         return killed_wolves
 
+    def is_birth_time(self, step):
+        """
+        Sprawdza, czy krok należy do okresu narodzin.
+        """
+        birth_time = self.steps_in_year // 12 * 4
+        return birth_time - 1 <= step < birth_time + 1
+
+    def is_death_time(self, step):
+        """
+        Sprawdza, czy krok należy do okresu zimowej śmiertelności.
+        """
+        death_start, death_end = self.steps_in_year // 12 * 11, self.steps_in_year // 12 * 2
+        return step >= death_start or step <= death_end
+
     def calculate_delta(self, model, target_population):
         """
         Oblicza różnicę między aktualną populacją
@@ -0,0 +1,63 @@
+import os
+import random
+
+
+def _propose_chunk(propose, agents, seed):
+    rng = random.Random(seed)
+    return [propose(agent, rng=rng) for agent in agents]
+
+
+def propose_moves(agents, propose, executor=None, chunks=None, rng=random):
+    """
+    Faza 1: każdy agent niezależnie proponuje ruchy na podstawie stanu sprzed kroku.
+    propose(agent, rng=rng) zwraca listę opcji (pozycja, zasób) w kolejności preferencji.
+    Jeśli podano executor (wątki lub procesy), agenci są dzieleni na części liczone równolegle;
+    każda część losuje z własnego generatora o ziarnie pobranym z rng, więc przebieg z ziarnem
+    jest powtarzalny (przy tej samej liczbie części).
+    """
+    agents = list(agents)
+    if executor is None or len(agents) < 2:
+        return [propose(agent, rng=rng) for agent in agents]
+
+    chunks = chunks or os.cpu_count() or 1
+    size = -(-len(agents) // chunks)
+    parts = [agents[i:i + size] for i in range(0, len(agents), size)]
+    seeds = [rng.randrange(2 ** 32) for _ in parts]
+
+    proposals = []
+    for part in executor.map(_propose_chunk, [propose] * len(parts), parts, seeds):
+        proposals.extend(part)
+    return proposals
+
+
+def resolve_moves(proposals, capacity=2, rng=random):
+    """
+    Faza 2: rozwiązuje konflikty między propozycjami w losowej kolejności priorytetów.
+    Opcja z zasobem (np. jeleniem) jest przyjmowana, dopóki zasób ma mniej niż capacity chętnych,
+    opcja bez zasobu - jeśli pole nie jest jeszcze zajęte. Ostatnia opcja agenta jest zawsze przyjmowana.
+    Zwraca wybrane pozycje w kolejności propozycji.
+    """
+    order = list(range(len(proposals)))
+    rng.shuffle(order)
+
+    claims = {}
+    occupied = set()
+    chosen = [None] * len(proposals)
+
+    for i in order:
+        options = proposals[i]
+        position = options[-1][0]
+        for cell, resource in options[:-1]:
+            if resource is not None:
+                if claims.get(resource, 0) < capacity:
+                    claims[resource] = claims.get(resource, 0) + 1
+                    position = cell
+                    break
+            elif cell not in occupied:
+                position = cell
+                break
+
+        occupied.add(position)
+        chosen[i] = position
+
+    return chosen
@@ -0,0 +1,45 @@
+import gzip
+import json
+from core.runner import HeadlessSimulation
+
+
+def snapshot(year, step, packs, deer_habitats):
+    """
+    Zwraca stan jednego kroku: rok, krok, watahy (id, x, y, liczba wilków) i pozycje jeleni.
+    """
+    return {
+        "year": year,
+        "step": step,
+        "packs": [(agent.id, agent.x, agent.y, agent.wolf_count) for agent in packs],
+        "deer": [tuple(position) for position in deer_habitats],
+    }
+
+
+def record_run(params=None, end_year=2020, seed=None, steps_per_year=72, grid_size=20):
+    """
+    Uruchamia symulację bez GUI i zapisuje stan po każdym kroku.
+    """
+    simulation = HeadlessSimulation(params, steps_per_year, grid_size, seed)
+    frames = [snapshot(2000, -1, simulation.wolves.schedule, simulation.deer_habitats.get_habitats())]
+
+    def on_step(sim):
+        frames.append(snapshot(sim.current_year, sim.steps, sim.wolves.schedule, sim.deer_habitats.get_habitats()))
+
+    simulation.run(end_year, on_step=on_step)
+    return {"grid_size": grid_size, "steps_per_year": steps_per_year, "frames": frames}
+
+
+def save_recording(recording, path):
+    """
+    Zapisuje nagranie przebiegu do skompresowanego pliku JSON.
+    """
+    with gzip.open(path, "wt") as file:
+        json.dump(recording, file)
+
+
+def load_recording(path):
+    """
+    Wczytuje nagranie zapisane przez save_recording.
+    """
+    with gzip.open(path, "rt") as file:
+        return json.load(file)
@@ -0,0 +1,165 @@
+import gzip
+import json
+
+
+def encode_delta(previous, frame):
+    """
+    Zapisuje różnicę między dwoma kolejnymi stanami: ruchy watah, zmiany liczebności,
+    nowe watahy (podziały), usunięte watahy oraz zmiany pozycji i liczby jeleni.
+    """
+    before = {pack_id: (x, y, count) for pack_id, x, y, count in previous["packs"]}
+    delta = {"year": frame["year"], "step": frame["step"], "moves": [], "counts": [], "splits": []}
+
+    seen = set()
+    for pack_id, x, y, count in frame["packs"]:
+        seen.add(pack_id)
+        if pack_id not in before:
+            delta["splits"].append((pack_id, x, y, count))
+            continue
+        old_x, old_y, old_count = before[pack_id]
+        if (x, y) != (old_x, old_y):
+            delta["moves"].append((pack_id, x, y))
+        if count != old_count:
+            delta["counts"].append((pack_id, count))
+
+    delta["removed"] = [pack_id for pack_id in before if pack_id not in seen]
+
+    old_deer, new_deer = previous["deer"], frame["deer"]
+    delta["deer"] = [
+        (i, x, y) for i, (x, y) in enumerate(new_deer)
+        if i >= len(old_deer) or tuple(old_deer[i]) != (x, y)
+    ]
+    delta["deer_count"] = len(new_deer)
+    return delta
+
+
+def apply_delta(packs, deer, delta):
+    """
+    Nakłada różnicę na stan (słownik id -> [x, y, liczba] oraz listę jeleni), modyfikując go w miejscu.
+    """
+    for pack_id, x, y in delta["moves"]:
+        packs[pack_id][0], packs[pack_id][1] = x, y
+    for pack_id, count in delta["counts"]:
+        packs[pack_id][2] = count
+    for pack_id, x, y, count in delta["splits"]:
+        packs[pack_id] = [x, y, count]
+    for pack_id in delta["removed"]:
+        del packs[pack_id]
+
+    del deer[delta["deer_count"]:]
+    for i, x, y in delta["deer"]:
+        if i < len(deer):
+            deer[i] = (x, y)
+        else:
+            deer.append((x, y))
+
+
+class Replay:
+    """
+    Zapis przebiegu symulacji: co keyframe_interval kroków pełny stan, a pomiędzy nimi różnice.
+    Odczyt dowolnego kroku wymaga co najwyżej keyframe_interval - 1 nałożeń różnic.
+    Przy podanym max_keyframes przechowywane są tylko ostatnie odcinki zapisu, a first_step
+    wskazuje numer najstarszego zachowanego kroku.
+    """
+    def __init__(self, grid_size=20, keyframe_interval=72, max_keyframes=None):
+        self.grid_size = grid_size
+        self.keyframe_interval = keyframe_interval
+        self.max_keyframes = max_keyframes
+        self.keyframes = []
+        self.deltas = []
+        self.previous = None
+        self.first_step = 0
+
+    def __len__(self):
+        return len(self.deltas)
+
+    def record(self, frame):
+        """
+        Dodaje stan kolejnego kroku (w formacie core.recording.snapshot).
+        """
+        if len(self.deltas) % self.keyframe_interval == 0:
+            if self.max_keyframes is not None and len(self.keyframes) >= self.max_keyframes:
+                del self.keyframes[0]
+                del self.deltas[:self.keyframe_interval]
+                self.first_step += self.keyframe_interval
+            self.keyframes.append(frame)
+            self.deltas.append(None)
+        else:
+            self.deltas.append(encode_delta(self.previous, frame))
+        self.previous = frame
+
+    def frame(self, index):
+        """
+        Odtwarza stan kroku o podanym indeksie, zaczynając od najbliższej wcześniejszej klatki kluczowej.
+        """
+        if not 0 <= index < len(self.deltas):
+            raise IndexError(f"Replay step {index} out of range (0-{len(self.deltas) - 1}).")
+
+        start = index - index % self.keyframe_interval
+        state = self.keyframe_state(start // self.keyframe_interval)
+        for i in range(start + 1, index + 1):
+            self.apply(state, self.deltas[i])
+        return self.state_frame(state)
+
+    def frames(self):
+        """
+        Zwraca kolejne stany całego zapisu, nakładając różnice po kolei.
+        """
+        state = None
+        for index, delta in enumerate(self.deltas):
+            if index % self.keyframe_interval == 0:
+                state = self.keyframe_state(index // self.keyframe_interval)
+            else:
+                self.apply(state, delta)
+            yield self.state_frame(state)
+
+    def keyframe_state(self, number):
+        keyframe = self.keyframes[number]
+        return {
+            "year": keyframe["year"],
+            "step": keyframe["step"],
+            "packs": {pack_id: [x, y, count] for pack_id, x, y, count in keyframe["packs"]},
+            "deer": [tuple(position) for position in keyframe["deer"]],
+        }
+
+    @staticmethod
+    def apply(state, delta):
+        apply_delta(state["packs"], state["deer"], delta)
+        state["year"], state["step"] = delta["year"], delta["step"]
+
+    @staticmethod
+    def state_frame(state):
+        return {
+            "year": state["year"],
+            "step": state["step"],
+            "packs": [(pack_id, x, y, count) for pack_id, (x, y, count) in state["packs"].items()],
+            "deer": list(state["deer"]),
+        }
+
+    def as_recording(self):
+        """
+        Zwraca zapis w formacie nagrania (core.recording), np. do eksportu klatek.
+        """
+        return {"grid_size": self.grid_size, "frames": list(self.frames())}
+
+    def save(self, path):
+        with gzip.open(path, "wt") as file:
+            json.dump({
+                "grid_size": self.grid_size,
+                "keyframe_interval": self.keyframe_interval,
+                "max_keyframes": self.max_keyframes,
+                "first_step": self.first_step,
+                "keyframes": self.keyframes,
+                "deltas": self.deltas,
+            }, file)
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rt") as file:
+            data = json.load(file)
+        replay = cls(data["grid_size"], data["keyframe_interval"], data.get("max_keyframes"))
+        replay.keyframes = data["keyframes"]
+        replay.deltas = data["deltas"]
+        replay.first_step = data.get("first_step", 0)
+        replay.previous = replay.frame(len(replay.deltas) - 1) if replay.deltas else None
+        return replay
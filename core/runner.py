@@ -0,0 +1,166 @@
+import contextlib
+import math
+import os
+import random
+from core.agent_model import WolfModel, DeerHabitats
+from core.history import History
+from core.math_model import PopulationModel
+from core.scheduler import StepScheduler
+from core.terrain import Terrain, load_terrain
+
+# parametry, które można ustawić w PopulationModel przy uruchamianiu bez GUI
+PARAMETERS = ("death_rate", "birth_rate", "food_access", "hunting", "growth_rate", "carrying_capacity")
+
+
+class HeadlessSimulation:
+    """
+    Symulacja bez interfejsu graficznego.
+    Odwzorowuje pętlę z klasy Simulation, ale parametry są stałe i podawane w słowniku,
+    dzięki czemu wiele przebiegów można uruchamiać w skryptach lub w osobnych procesach.
+    Tak jak w GUI ruch korzysta z terenu (core.terrain); terrain=False wyłącza go,
+    a zamiast True można podać własny obiekt Terrain.
+    Podanie executor (wątki lub procesy) włącza synchroniczny ruch (core.movement),
+    w którym propozycje ruchów liczone są równolegle.
+    """
+    def __init__(self, params=None, steps_per_year=72, grid_size=20, seed=None, width=900, height=500,
+                 synchronous=False, movement_substeps=1, demography_interval=None, terrain=True, executor=None):
+        if seed is not None:
+            random.seed(seed)
+
+        self.params = dict(params or {})
+        self.steps_per_year = steps_per_year
+        self.grid_size = grid_size
+        self.cols = width // grid_size
+        self.rows = height // grid_size
+
+        self.wolf_population = PopulationModel()
+        self.wolf_population.steps_in_year = steps_per_year
+        for name, value in self.params.items():
+            if name not in PARAMETERS:
+                raise ValueError(f"Unknown simulation parameter: {name}")
+            setattr(self.wolf_population, name, value)
+        self.scheduler = StepScheduler(self.wolf_population, movement_substeps, demography_interval)
+
+        self.wolf_count = self.wolf_population.population[0]
+        self.killed_wolves = 0
+        self.wolves_to_kill = 0
+        self.last_killed = 0
+        self.steps = -1
+        self.current_year = 2000
+
+        if isinstance(terrain, Terrain):
+            self.terrain = terrain
+        else:
+            self.terrain = load_terrain(self.cols, self.rows) if terrain else None
+
+        synchronous = synchronous or executor is not None
+        self.wolves = WolfModel(self.wolf_count, self.cols, self.rows, synchronous, executor, self.terrain)
+        self.deer_habitats = DeerHabitats(35, self.cols, self.rows, grid_size, synchronous, executor, self.terrain)
+        self.deer_habitats.deer_count = math.floor(self.wolf_population.food_access * 35)
+        self.deer_habitats.adjust_deer_population()
+
+    def update_simulation_state(self):
+        """
+        Przesuwa watahy i jelenie oraz aktualizuje populację (odpowiednik Simulation.update_simulation_state).
+        """
+        self.deer_habitats.adjust_deer_population()
+
+        for _ in range(self.scheduler.movement_substeps):
+            wolf_positions = [(agent.x, agent.y) for agent in self.wolves.schedule]
+            self.deer_habitats.step(wolf_positions)
+            deer_positions = self.deer_habitats.get_habitats()
+            self.wolves.step(deer_positions)
+            self.wolves.split_large_packs()
+
+        return self.scheduler.update_population(self.wolves, self.current_year, self.steps)
+
+    def step(self):
+        """
+        Wykonuje jeden krok symulacji. Zwraca True, jeśli w tym kroku rozpoczął się nowy rok.
+        """
+        killed_wolves = self.update_simulation_state()
+        self.last_killed = killed_wolves
+
+        self.steps += 1
+        new_year = False
+        if self.steps % self.steps_per_year == 0 and self.steps > 0:
+            self.killed_wolves += self.wolves_to_kill
+            self.wolves_to_kill = 0
+            self.current_year += 1
+            self.steps = -1
+            new_year = True
+
+        if self.wolves_to_kill == 0 and killed_wolves > 0:
+            self.wolves_to_kill = killed_wolves
+
+        return new_year
+
+    def wolf_total(self):
+        """Zwraca aktualną liczbę wilków."""
+        return self.wolf_population.count_wolves(self.wolves)
+
+    def run(self, end_year=2020, on_step=None, on_year=None, quiet=True, keep_summary=True):
+        """
+        Uruchamia symulację do początku roku end_year.
+        on_step(simulation) jest wywoływane po każdym kroku, on_year(year, wolves, killed)
+        na początku każdego roku; jeśli on_year zwróci False, symulacja zostaje przerwana.
+        Zwraca podsumowanie z liczbą wilków i zabitych wilków na początku każdego roku
+        (przy keep_summary=False tylko dla ostatniego roku, aby pamięć nie rosła z horyzontem).
+        """
+        summary = {"years": [self.current_year], "wolves": [self.wolf_total()], "killed": [self.killed_wolves]}
+
+        with open(os.devnull, "w") as devnull, contextlib.ExitStack() as stack:
+            if quiet:
+                stack.enter_context(contextlib.redirect_stdout(devnull))
+
+            while self.current_year < end_year:
+                new_year = self.step()
+                if on_step is not None:
+                    on_step(self)
+                if not new_year:
+                    continue
+
+                wolves = self.wolf_total()
+                summary["years"].append(self.current_year)
+                summary["wolves"].append(wolves)
+                summary["killed"].append(self.killed_wolves)
+                if not keep_summary:
+                    for values in summary.values():
+                        del values[:-1]
+                if on_year is not None and on_year(self.current_year, wolves, self.killed_wolves) is False:
+                    break
+
+        return summary
+
+
+def run_headless(params=None, end_year=2020, seed=None, steps_per_year=72, grid_size=20, on_year=None,
+                 terrain=True, movement_substeps=1, demography_interval=None, synchronous=False, executor=None):
+    """
+    Wykonuje pojedynczy przebieg symulacji bez GUI i zwraca jego roczne podsumowanie.
+    """
+    simulation = HeadlessSimulation(params, steps_per_year, grid_size, seed, synchronous=synchronous,
+                                    movement_substeps=movement_substeps, demography_interval=demography_interval,
+                                    terrain=terrain, executor=executor)
+    return simulation.run(end_year, on_year=on_year)
+
+
+def run_long_horizon(params=None, end_year=3000, path=None, seed=None, steps_per_year=72, grid_size=20,
+                     downsample=1, recent_steps=72 * 10, terrain=True):
+    """
+    Wykonuje długi przebieg (np. na stulecia) przy stałym zużyciu pamięci.
+    Ostatnie kroki są w buforze cyklicznym, a roczne agregaty trafiają do pliku CSV (path).
+    Zwraca obiekt History.
+    """
+    simulation = HeadlessSimulation(params, steps_per_year, grid_size, seed, terrain=terrain)
+    history = History(path, recent_steps, downsample)
+
+    def on_step(sim):
+        if sim.steps == -1:
+            history.end_year(sim.killed_wolves)
+        history.add_step(sim.current_year, sim.steps, sim.wolf_total(), sim.killed_wolves)
+
+    try:
+        simulation.run(end_year, on_step=on_step, keep_summary=False)
+    finally:
+        history.close()
+    return history
@@ -0,0 +1,38 @@
+class StepScheduler:
+    """
+    Harmonogram kroków o dwóch częstotliwościach.
+    Ruch watah i jeleni wykonywany jest movement_substeps razy w każdym kroku kalendarza,
+    a aktualizacja demograficzna (PopulationModel.update_population) tylko w krokach należących
+    do okresów narodzin i śmiertelności - we wszystkich (demography_interval=None) albo
+    co demography_interval kroków. Krótki okres narodzin jest zawsze uwzględniany w całości.
+    Liczba zabitych wilków jest wyznaczana w każdym kroku.
+    Obie częstotliwości nie zależą od rozmiaru pola siatki.
+    """
+    def __init__(self, population_model, movement_substeps=1, demography_interval=None):
+        if movement_substeps < 1:
+            raise ValueError("movement_substeps must be at least 1.")
+        if demography_interval is not None and demography_interval < 1:
+            raise ValueError("demography_interval must be at least 1.")
+
+        self.population_model = population_model
+        self.movement_substeps = movement_substeps
+        self.demography_interval = demography_interval
+
+    def runs_demography(self, step):
+        """
+        Sprawdza, czy w danym kroku roku należy zaktualizować populację.
+        """
+        if self.population_model.is_birth_time(step):
+            return True
+        if not self.population_model.is_death_time(step):
+            return False
+        return self.demography_interval is None or (step + 1) % self.demography_interval == 0
+
+    def update_population(self, model, year, step):
+        """
+        Aktualizuje populację w krokach wskazanych przez runs_demography, a w pozostałych
+        tylko wyznacza liczbę zabitych wilków. Zwraca liczbę zabitych wilków.
+        """
+        if self.runs_demography(step):
+            return self.population_model.update_population(model, year, step)
+        return self.population_model.hunting_kills(year)
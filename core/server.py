@@ -0,0 +1,331 @@
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor
+from core.cache import run_cached
+from core.runner import PARAMETERS, HeadlessSimulation
+
+# Protokół: jeden obiekt JSON na linię.
+#   {"op": "submit", "params": {...}, "end_year": 2050, "seed": 1, "steps_per_year": 72}
+#   {"op": "cancel", "job": 3}
+#   {"op": "status"}
+# Serwer odpowiada zdarzeniami: accepted, busy (pełna kolejka, zadanie nie zostało przyjęte),
+# progress (co rok symulacji; wolny klient może część z nich pominąć), done, cancelled, error, status.
+
+_worker_state = {}
+
+
+def _warm_up(progress, cancelled):
+    """
+    Inicjalizuje proces roboczy: zapamiętuje kolejkę postępu i słownik anulowanych zadań
+    oraz wykonuje krótki przebieg, aby moduły i tablica trajektorii były już gotowe.
+    """
+    _worker_state["progress"] = progress
+    _worker_state["cancelled"] = cancelled
+    HeadlessSimulation(seed=0).run(2001)
+    # przebiegi bez ziarna nie mogą być identyczne we wszystkich procesach po rozgrzewce
+    random.seed()
+
+
+def _ping():
+    return True
+
+
+def run_job(job_id, spec):
+    """
+    Wykonuje zadanie w procesie roboczym. Postęp po każdym roku symulacji oraz końcowy wynik
+    trafiają do wspólnej kolejki, dzięki czemu klient otrzymuje je we właściwej kolejności.
+    Dla zadania z ziarnem postęp wyniku z pamięci podręcznej jest odtwarzany z zapisanych lat.
+    """
+    progress = _worker_state["progress"]
+    cancelled = _worker_state["cancelled"]
+
+    def on_year(year, wolves, killed):
+        progress.put((job_id, "progress", {"year": year, "wolves": wolves, "killed": killed}))
+        return job_id not in cancelled
+
+    if spec["seed"] is None:
+        simulation = HeadlessSimulation(spec["params"], spec["steps_per_year"])
+        summary = simulation.run(spec["end_year"], on_year=on_year, keep_summary=False)
+    else:
+        # przebiegi z ziarnem są odczytywane z pamięci podręcznej wyników (lub do niej zapisywane)
+        summary = run_cached(spec["params"], spec["end_year"], spec["seed"], spec["steps_per_year"], on_year=on_year)
+    result = {"year": summary["years"][-1], "wolves": summary["wolves"][-1], "killed": summary["killed"][-1]}
+    event = "done" if summary["years"][-1] >= spec["end_year"] else "cancelled"
+    progress.put((job_id, event, {"result": result}))
+
+
+def parse_job(message):
+    """
+    Sprawdza zgłoszenie zadania i uzupełnia wartości domyślne.
+    """
+    params = message.get("params") or {}
+    if not isinstance(params, dict):
+        raise ValueError("Simulation parameters must be a JSON object.")
+    unknown = set(params) - set(PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown simulation parameters: {', '.join(sorted(unknown))}")
+    end_year = int(message.get("end_year", 2020))
+    if end_year <= 2000:
+        raise ValueError("end_year must be later than 2000.")
+    steps_per_year = int(message.get("steps_per_year", 72))
+    if steps_per_year < 1:
+        raise ValueError("steps_per_year must be a positive integer.")
+    seed = message.get("seed")
+    if seed is not None and not isinstance(seed, int):
+        raise ValueError("seed must be an integer.")
+    return {
+        "params": {name: float(value) for name, value in params.items()},
+        "end_year": end_year,
+        "seed": seed,
+        "steps_per_year": steps_per_year,
+    }
+
+
+class Job:
+    def __init__(self, job_id, spec, client):
+        self.id = job_id
+        self.spec = spec
+        self.client = client
+        self.started = False
+        self.cancelled = False
+
+
+class Client:
+    """
+    Połączenie klienta z własną ograniczoną kolejką wychodzącą i zadaniem zapisującym.
+    Wolny klient spowalnia tylko siebie: odpowiedzi na jego polecenia czekają na miejsce w kolejce,
+    a przy pełnej kolejce zdarzenia progress są pomijane (zdarzenia końcowe nigdy).
+    """
+    def __init__(self, writer, max_buffered=256):
+        self.writer = writer
+        self.jobs = set()
+        self.closed = False
+        self.outbox = asyncio.Queue(max_buffered)
+        self.task = asyncio.create_task(self.write_events())
+
+    async def write_events(self):
+        while True:
+            event = await self.outbox.get()
+            try:
+                self.writer.write((json.dumps(event) + "\n").encode())
+                await self.writer.drain()
+            except ConnectionError:
+                self.closed = True
+                return
+
+    async def send(self, event):
+        """Dopisuje odpowiedź do kolejki, czekając na wolne miejsce."""
+        if not self.closed:
+            await self.outbox.put(event)
+
+    def deliver(self, event):
+        """
+        Dopisuje zdarzenie zadania bez czekania. Przy pełnej kolejce progress jest pomijany,
+        a pozostałe zdarzenia czekają na miejsce w osobnym zadaniu.
+        """
+        if self.closed:
+            return
+        if not self.outbox.full():
+            self.outbox.put_nowait(event)
+        elif event["event"] != "progress":
+            asyncio.create_task(self.send(event))
+
+    def close(self):
+        self.closed = True
+        self.task.cancel()
+        self.writer.close()
+
+
+class JobServer:
+    """
+    Lokalny serwer zadań symulacji.
+    Zadania trafiają do ograniczonej kolejki (przy pełnej kolejce zgłoszenie dostaje odpowiedź busy,
+    a pozostałe polecenia, np. cancel, są nadal obsługiwane), a następnie do stałej puli procesów
+    roboczych, które są rozgrzewane przy starcie serwera.
+    """
+    def __init__(self, workers=None, max_pending=64):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.max_pending = max_pending
+        self.queue = asyncio.Queue()
+        self.jobs = {}
+        self.running = 0
+        self.job_ids = itertools.count(1)
+
+        self.manager = multiprocessing.Manager()
+        self.progress = self.manager.Queue()
+        self.cancelled = self.manager.dict()
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_warm_up, initargs=(self.progress, self.cancelled)
+        )
+        self.tasks = []
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        # uruchomienie wszystkich procesów roboczych przed przyjęciem pierwszego zadania
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _ping) for _ in range(self.workers)))
+        self.tasks = [asyncio.create_task(self.dispatch()) for _ in range(self.workers)]
+        self.tasks.append(asyncio.create_task(self.forward_progress()))
+
+    async def dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            try:
+                # zadanie anulowane w kolejce zostało już zgłoszone klientowi jako cancelled
+                if job.cancelled:
+                    continue
+                job.started = True
+                self.running += 1
+                try:
+                    await loop.run_in_executor(self.executor, run_job, job.id, job.spec)
+                except Exception as error:
+                    job.client.deliver({"event": "error", "job": job.id, "message": str(error)})
+                    self.finish(job)
+                finally:
+                    self.running -= 1
+            finally:
+                self.queue.task_done()
+
+    async def forward_progress(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job_id, event, payload = await loop.run_in_executor(None, self.progress.get)
+            job = self.jobs.get(job_id)
+            if job is None:
+                continue
+            job.client.deliver({"event": event, "job": job_id, **payload})
+            if event != "progress":
+                self.finish(job)
+
+    def pending(self):
+        """Zwraca liczbę zadań oczekujących na wolny proces (bez anulowanych)."""
+        return sum(1 for job in self.jobs.values() if not job.started)
+
+    def finish(self, job):
+        self.jobs.pop(job.id, None)
+        self.cancelled.pop(job.id, None)
+        job.client.jobs.discard(job.id)
+
+    async def cancel(self, job_id):
+        """
+        Anuluje zadanie: oczekujące od razu, a wykonywane po bieżącym roku symulacji.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        job.cancelled = True
+        if job.started:
+            self.cancelled[job_id] = True
+        else:
+            self.finish(job)
+            await job.client.send({"event": "cancelled", "job": job_id})
+        return True
+
+    async def handle_client(self, reader, writer):
+        client = Client(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    await self.handle_message(client, message)
+                except (ValueError, TypeError, KeyError) as error:
+                    await client.send({"event": "error", "message": str(error)})
+        finally:
+            client.close()
+            for job_id in list(client.jobs):
+                await self.cancel(job_id)
+
+    async def handle_message(self, client, message):
+        if not isinstance(message, dict):
+            raise ValueError("Expected a JSON object.")
+        op = message.get("op")
+        if op == "submit":
+            spec = parse_job(message)
+            if self.pending() >= self.max_pending:
+                await client.send({"event": "busy", "queued": self.pending()})
+                return
+            job = Job(next(self.job_ids), spec, client)
+            self.jobs[job.id] = job
+            client.jobs.add(job.id)
+            self.queue.put_nowait(job)
+            await client.send({"event": "accepted", "job": job.id})
+            # wolny proces roboczy może od razu pobrać zadanie, zwalniając miejsce wśród oczekujących
+            await asyncio.sleep(0)
+        elif op == "cancel":
+            job_id = int(message["job"])
+            if job_id not in client.jobs or not await self.cancel(job_id):
+                await client.send({"event": "error", "job": job_id, "message": "Unknown job."})
+        elif op == "status":
+            await client.send({"event": "status", "queued": self.pending(), "running": self.running})
+        else:
+            raise ValueError(f"Unknown operation: {op}")
+
+    async def serve(self, host="127.0.0.1", port=8765, path=None):
+        """
+        Uruchamia serwer na gnieździe Unix (path) lub TCP (host, port).
+        """
+        await self.start()
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle_client, path=path)
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        for task in self.tasks:
+            task.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.manager.shutdown()
+
+
+async def submit(spec, host="127.0.0.1", port=8765, path=None):
+    """
+    Prosty klient: wysyła jedno zadanie i zwraca kolejne zdarzenia aż do jego zakończenia.
+    """
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write((json.dumps(dict(spec, op="submit")) + "\n").encode())
+        await writer.drain()
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            event = json.loads(line)
+            yield event
+            if event["event"] in ("done", "cancelled", "error", "busy"):
+                return
+    finally:
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local job server for headless wolf simulation runs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="serve on a Unix socket at this path instead of TCP")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-pending", type=int, default=64)
+    args = parser.parse_args()
+
+    async def run():
+        await JobServer(args.workers, args.max_pending).serve(args.host, args.port, args.unix)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,53 @@
+import functools
 import math
+import multiprocessing
 import threading
+from concurrent.futures import ProcessPoolExecutor
 import pygame
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import pyqtSignal, QObject
 from core.agent_model import WolfModel, DeerHabitats
+from core.cache import ResultCache, result_key, run_cached
 from core.math_model import PopulationModel
-from gui.visualization import visualization_init, visualization_update
+from core.recording import snapshot
+from core.replay import Replay
+from core.scheduler import StepScheduler
+from core.statistics import band_cached
+from core.terrain import load_terrain
+from gui.visualization import (
+    BATCHED_PACK_LIMIT, visualization_init, visualization_update, visualization_update_batched,
+)
 from gui.gui_components import GUIComponents
 
 
+# kroki kalendarza w roku (opcja "Step count") i rozmiar pola siatki (opcja "Grid resolution") wybierane
+# niezależnie; od rozmiaru pola nie zależy ani częstotliwość ruchu, ani częstotliwość zmian populacji
+STEPS_PER_YEAR = {"week": 72, "two weeks": 36, "month": 12}
+GRID_SIZES = {"fine": 20, "medium": 40, "coarse": 60}
+# liczba ruchów w kroku kalendarza oraz co ile kroków aktualizowana jest populacja (StepScheduler)
+MOVEMENT_SUBSTEPS = {"1": 1, "2": 2, "3": 3, "4": 4}
+DEMOGRAPHY_INTERVALS = {"every step": None, "every 2 steps": 2, "every 4 steps": 4, "every 8 steps": 8}
+# liczba ostatnich lat przechowywanych w zapisie przebiegu (Replay)
+REPLAY_YEARS = 50
+# ziarna przebiegów zespołu, z którego liczony jest przedział ufności na wykresie populacji
+BAND_SEEDS = (0, 1, 2, 3)
+
+
 class SignalManager(QObject):
     """Klasa zarządzająca sygnałami do komunikacji między wątkiem symulacji a GUI."""
     update_visualization_signal = pyqtSignal()
+    update_projection_signal = pyqtSignal(str, object)
+    update_band_signal = pyqtSignal(str, object)
+    simulation_finished_signal = pyqtSignal()
 
 
 class Simulation:
-    def __init__(self):
+    def __init__(self, end_year=None):
         self.signal_manager = SignalManager()
         self.signal_manager.update_visualization_signal.connect(self.update_visualization)
+        self.signal_manager.update_projection_signal.connect(self.show_projection)
+        self.signal_manager.update_band_signal.connect(self.show_band)
+        self.signal_manager.simulation_finished_signal.connect(self.simulation_finished)
 
         self.app = QApplication([])
         self.gui_components = GUIComponents(
@@ -30,50 +60,185 @@ class Simulation:
 
         # Inicjalizacja symulacji
         self.wolf_population = PopulationModel()
+        self.scheduler = StepScheduler(self.wolf_population)
         self.wolf_count = self.wolf_population.population[0]
         self.killed_wolves = 0
         self.wolves_to_kill = 0
         self.simulation_started = False
+        # pętla wątku działa, dopóki flagi nie wyczyści Stop lub Reset; ponowny Start nie podtrzymuje starego wątku
+        self.running = False
         self.thread = None
+        self.reset_pending = False
         self.steps = -1
         self.steps_per_year = 72
         self.current_year = 2000
+        self.end_year = end_year
+
+        # Prognozy dla ustawień suwaków liczone w osobnym procesie i zapamiętywane na dysku
+        self.result_cache = ResultCache()
+        self.projection_executor = ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        )
+        self.projection_future = None
+        self.projection_year = 2020
+        self.projection_seed = 0
+        self.projection_key = None
+        # przedział z zespołu przebiegów liczony w osobnym procesie, aby nie opóźniał prognozy
+        self.band_executor = ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        )
+        self.band_future = None
 
         self.grid_size = 20
         self.pygame_screen, self.wolf_image, self.grid_color, self.background_color = visualization_init()
         self.cols = self.pygame_screen.get_width() // self.grid_size
         self.rows = self.pygame_screen.get_height() // self.grid_size
 
-        self.wolves = WolfModel(self.wolf_count, self.cols, self.rows)
-        self.deer_habitats = DeerHabitats(35, self.cols, self.rows)
+        self.terrain = load_terrain(self.cols, self.rows)
+        self.wolves = WolfModel(self.wolf_count, self.cols, self.rows, terrain=self.terrain)
+        self.deer_habitats = DeerHabitats(35, self.cols, self.rows, terrain=self.terrain)
+        self.replay = self.new_replay()
+
+        # Wykres populacji z obserwacjami avg_pop
+        self.population_chart = self.gui_components.population_chart
+        self.population_chart.set_observed(self.wolf_population.years, self.wolf_population.avg_pop)
+        self.population_chart.clear(self.current_year, self.wolf_count)
 
         # Podpięcie sygnałów GUI
-        self.gui_components.step_combobox.currentIndexChanged.connect(self.update_grid_size)
+        for combobox in (
+            self.gui_components.step_combobox,
+            self.gui_components.grid_combobox,
+            self.gui_components.substeps_combobox,
+            self.gui_components.demography_combobox,
+        ):
+            combobox.currentIndexChanged.connect(self.update_settings)
+        self.gui_components.replay_slider.valueChanged.connect(self.show_replay_frame)
         self.gui_components.food_access_slider.valueChanged.connect(self.update_food_access)
+        for slider in (
+            self.gui_components.death_rate_slider,
+            self.gui_components.birth_rate_slider,
+            self.gui_components.food_access_slider,
+            self.gui_components.hunting_slider,
+        ):
+            slider.valueChanged.connect(self.update_projection)
 
         self.update_visualization()
+        self.update_projection()
 
-    def update_grid_size(self):
-        """Aktualizuje rozmiar siatki i kroki w roku na podstawie wybranego trybu."""
-        selected_option = self.gui_components.get_selected_steps()
-        steps_options = ["week", "two weeks", "month"]
-        steps_values = [72, 36, 12]
-        self.steps_per_year = steps_values[steps_options.index(selected_option)]
+    def update_settings(self):
+        """
+        Aktualizuje kroki w roku, rozmiar siatki i harmonogram kroków na podstawie wybranych opcji.
+        Modele agentów tworzone są od nowa tylko przy zmianie rozmiaru siatki.
+        """
+        self.steps_per_year = STEPS_PER_YEAR[self.gui_components.get_selected_steps()]
+        self.scheduler = StepScheduler(
+            self.wolf_population,
+            MOVEMENT_SUBSTEPS[self.gui_components.get_selected_substeps()],
+            DEMOGRAPHY_INTERVALS[self.gui_components.get_selected_demography()],
+        )
 
-        if self.steps_per_year == 72:
-            self.grid_size = 20
-        elif self.steps_per_year == 36:
-            self.grid_size = 40
-        elif self.steps_per_year == 12:
-            self.grid_size = 60
+        grid_size = GRID_SIZES[self.gui_components.get_selected_grid()]
+        if grid_size != self.grid_size:
+            self.grid_size = grid_size
+            self.cols = self.pygame_screen.get_width() // self.grid_size
+            self.rows = self.pygame_screen.get_height() // self.grid_size
 
-        self.cols = self.pygame_screen.get_width() // self.grid_size
-        self.rows = self.pygame_screen.get_height() // self.grid_size
-
-        self.wolves = WolfModel(self.wolf_count, self.cols, self.rows)
-        self.deer_habitats = DeerHabitats(35, self.cols, self.rows, self.grid_size)
+            self.terrain = load_terrain(self.cols, self.rows)
+            self.wolves = WolfModel(self.wolf_count, self.cols, self.rows, terrain=self.terrain)
+            self.deer_habitats = DeerHabitats(35, self.cols, self.rows, self.grid_size, terrain=self.terrain)
 
+        self.replay = self.new_replay()
         self.update_visualization()
+        self.update_projection()
+
+    def schedule_settings(self):
+        """Zwraca ustawienia harmonogramu kroków w postaci argumentów dla przebiegów bez GUI."""
+        return {
+            "movement_substeps": self.scheduler.movement_substeps,
+            "demography_interval": self.scheduler.demography_interval,
+        }
+
+    def get_parameters(self):
+        """Zwraca słownik parametrów ustawionych suwakami."""
+        return {
+            "death_rate": self.gui_components.death_rate_slider.value() / 10.0,
+            "birth_rate": self.gui_components.birth_rate_slider.value() / 10.0,
+            "food_access": self.gui_components.food_access_slider.value() / 10.0,
+            "hunting": self.gui_components.hunting_slider.value() / 10.0,
+        }
+
+    def update_projection(self):
+        """
+        Pokazuje prognozę dla bieżących parametrów - od razu, jeśli wynik jest w pamięci podręcznej,
+        a w przeciwnym razie po przeliczeniu w tle.
+        """
+        params = self.get_parameters()
+        schedule = self.schedule_settings()
+        key = result_key(
+            params, self.projection_year, self.projection_seed, self.steps_per_year, self.grid_size, **schedule
+        )
+        self.projection_key = key
+
+        self.update_band(params, schedule)
+        summary = self.result_cache.get(key)
+        if summary is not None:
+            self.show_projection(key, summary)
+            return
+
+        self.gui_components.update_projection_counter(self.projection_year, None)
+        if self.projection_future is not None:
+            self.projection_future.cancel()
+        self.projection_future = self.projection_executor.submit(
+            run_cached, params, self.projection_year, self.projection_seed,
+            self.steps_per_year, self.grid_size, self.result_cache, **schedule
+        )
+        self.projection_future.add_done_callback(functools.partial(self.projection_done, key))
+
+    def projection_done(self, key, future):
+        """Przekazuje wynik prognozy z wątku puli procesów do GUI."""
+        if not future.cancelled() and future.exception() is None:
+            self.signal_manager.update_projection_signal.emit(key, future.result())
+
+    def show_projection(self, key, summary):
+        """Wyświetla prognozę, o ile nadal odpowiada bieżącym parametrom."""
+        if key == self.projection_key:
+            self.gui_components.update_projection_counter(summary["years"][-1], summary["wolves"][-1])
+
+    def update_band(self, params, schedule):
+        """
+        Nakłada na wykres populacji przedział 5-95% z zespołu przebiegów dla bieżących parametrów -
+        od razu, jeśli jest w pamięci podręcznej, a w przeciwnym razie po przeliczeniu w tle.
+        """
+        if self.band_future is not None:
+            self.band_future.cancel()
+        band = self.result_cache.get(self.band_key(params, schedule))
+        if band is not None:
+            self.population_chart.set_band(band, self.steps_per_year)
+            return
+
+        self.population_chart.set_band(None, self.steps_per_year)
+        self.band_future = self.band_executor.submit(
+            band_cached, params, self.projection_year, BAND_SEEDS,
+            self.steps_per_year, self.grid_size, self.result_cache, **schedule
+        )
+        self.band_future.add_done_callback(functools.partial(self.band_done, self.projection_key))
+
+    def band_key(self, params, schedule):
+        """Klucz przedziału w pamięci podręcznej (jak w core.statistics.band_cached)."""
+        return result_key(
+            params, self.projection_year, list(BAND_SEEDS), self.steps_per_year, self.grid_size, **schedule,
+            kind="band"
+        )
+
+    def band_done(self, key, future):
+        """Przekazuje przedział z wątku puli procesów do GUI."""
+        if not future.cancelled() and future.exception() is None:
+            self.signal_manager.update_band_signal.emit(key, future.result())
+
+    def show_band(self, key, band):
+        """Wyświetla przedział ufności, o ile nadal odpowiada bieżącym parametrom."""
+        if key == self.projection_key:
+            self.population_chart.set_band(band, self.steps_per_year)
 
     def update_food_access(self):
         """Aktualizuje dostęp do pożywienia na podstawie pozycji suwaka."""
@@ -88,25 +253,54 @@ class Simulation:
             self.simulation_started = True
             self.wolf_population.steps_in_year = self.steps_per_year
             self.gui_components.disable_steps_selection()
-            self.thread = threading.Thread(target=self.run_simulation)
-            self.thread.daemon = True
-            self.thread.start()
+            self.gui_components.disable_replay()
+            self.gui_components.update_year_counter(self.current_year)
+            self.update_visualization()
+            # jeśli poprzedni wątek jeszcze się kończy, zaległy reset zostanie wykonany, a symulacja
+            # uruchomiona ponownie w simulation_finished
+            if self.thread is None:
+                self.running = True
+                self.thread = threading.Thread(target=self.run_simulation)
+                self.thread.daemon = True
+                self.thread.start()
 
     def stop_simulation(self):
-        """Zatrzymuje symulację."""
+        """Zatrzymuje symulację; wątek kończy bieżący krok i zgłasza to sygnałem simulation_finished_signal."""
         self.simulation_started = False
+        self.running = False
+
+    def simulation_finished(self):
+        """Obsługuje zakończenie wątku symulacji (w wątku GUI)."""
+        self.thread = None
+        restart = self.simulation_started
+        if self.reset_pending:
+            self.reset_pending = False
+            self.reset_simulation()
+        if restart:
+            self.simulation_started = False
+            self.start_simulation()
+        else:
+            self.gui_components.enable_replay(len(self.replay))
 
     def reset_simulation(self):
         """Resetuje symulację do stanu początkowego."""
         self.stop_simulation()
-        self.wolves = WolfModel(self.wolf_count, self.cols, self.rows)
+        # stan jest zmieniany dopiero po zakończeniu bieżącego kroku przez wątek symulacji
+        if self.thread is not None:
+            self.reset_pending = True
+            return
+
+        self.wolves = WolfModel(self.wolf_count, self.cols, self.rows, terrain=self.terrain)
         self.steps = -1
         self.current_year = 2000
         self.killed_wolves = 0
         self.wolves_to_kill = 0
+        self.replay = self.new_replay()
+        self.gui_components.enable_replay(len(self.replay))
         self.gui_components.update_year_counter(self.current_year)
         self.gui_components.update_wolf_counter(self.wolf_count)
         self.gui_components.update_killed_wolf_counter(self.killed_wolves)
+        self.population_chart.clear(self.current_year, self.wolf_count)
         self.gui_components.enable_steps_selection()
         self.gui_components.death_rate_slider.setValue(10)
         self.gui_components.birth_rate_slider.setValue(10)
@@ -118,25 +312,24 @@ class Simulation:
         """
         Aktualizuje stan symulacji, w tym poruszanie watah wilków i jeleni oraz ich populacje.
         """
-        death_rate = self.gui_components.death_rate_slider.value() / 10.0
-        birth_rate = self.gui_components.birth_rate_slider.value() / 10.0
-        food_access = self.gui_components.food_access_slider.value() / 10.0
-        hunting = self.gui_components.hunting_slider.value() / 10.0
-
-        self.wolf_population.death_rate = death_rate
-        self.wolf_population.birth_rate = birth_rate
-        self.wolf_population.food_access = food_access
-        self.wolf_population.hunting = hunting
-        self.deer_habitats.deer_count = math.floor(food_access * 35)
+        params = self.get_parameters()
+
+        self.wolf_population.death_rate = params["death_rate"]
+        self.wolf_population.birth_rate = params["birth_rate"]
+        self.wolf_population.food_access = params["food_access"]
+        self.wolf_population.hunting = params["hunting"]
+        self.deer_habitats.deer_count = math.floor(params["food_access"] * 35)
         self.deer_habitats.adjust_deer_population()
 
-        wolf_positions = [(agent.x, agent.y) for agent in self.wolves.schedule]
-        self.deer_habitats.step(wolf_positions)
-        deer_positions = self.deer_habitats.get_habitats()
-        self.wolves.step(deer_positions)
-        self.wolves.split_large_packs()
+        for _ in range(self.scheduler.movement_substeps):
+            wolf_positions = [(agent.x, agent.y) for agent in self.wolves.schedule]
+            self.deer_habitats.step(wolf_positions)
+            deer_positions = self.deer_habitats.get_habitats()
+            self.wolves.step(deer_positions)
+            self.wolves.split_large_packs()
 
-        killed_wolves = self.wolf_population.update_population(self.wolves, self.current_year, self.steps)
+        # populacja zmienia się tylko w okresach narodzin i śmiertelności, zabici wilcy liczeni są w każdym kroku
+        killed_wolves = self.scheduler.update_population(self.wolves, self.current_year, self.steps)
         return killed_wolves
 
     def check_yearly_update(self):
@@ -154,13 +347,19 @@ class Simulation:
     def run_simulation(self):
         """Pętla symulacji."""
         clock = pygame.time.Clock()
-        while self.simulation_started:
+        while self.running:
             # Aktualizacja stanu symulacji
             killed_wolves = self.update_simulation_state()
 
             # Sprawdzenie i aktualizacja licznika rocznego
             self.steps += 1
             self.check_yearly_update()
+            self.record_replay_step()
+
+            # Zakończenie symulacji po osiągnięciu roku końcowego
+            if self.end_year is not None and self.current_year >= self.end_year:
+                self.simulation_started = False
+                self.running = False
 
             # Aktualizacja zabitych wilków, jeśli to konieczne
             if self.wolves_to_kill == 0 and killed_wolves > 0:
@@ -169,19 +368,65 @@ class Simulation:
             # Aktualizacja liczby wilków
             wolf_total = sum(agent.wolf_count for agent in self.wolves.schedule)
             self.gui_components.update_wolf_counter(wolf_total)
+            self.population_chart.add(self.current_year + (self.steps + 1) / self.steps_per_year, wolf_total)
 
             # Emitowanie sygnału do aktualizacji GUI
             self.signal_manager.update_visualization_signal.emit()
-            speed = self.gui_components.simulation_speed_slider.value()
-            clock.tick(speed)
+            if self.running:
+                speed = self.gui_components.simulation_speed_slider.value()
+                clock.tick(speed)
+
+        self.signal_manager.simulation_finished_signal.emit()
+
+    def new_replay(self):
+        """
+        Tworzy pusty zapis przebiegu z klatką kluczową co rok symulacji. Każdy rok to steps_per_year + 1
+        zapisanych stanów (kroki od -1 do steps_per_year - 1), więc klatki kluczowe przypadają na krok -1.
+        """
+        replay = Replay(self.grid_size, self.steps_per_year + 1, REPLAY_YEARS)
+        self.record_replay_step(replay)
+        return replay
+
+    def record_replay_step(self, replay=None):
+        """Dopisuje bieżący stan symulacji do zapisu przebiegu."""
+        if replay is None:
+            replay = self.replay
+        replay.record(
+            snapshot(self.current_year, self.steps, self.wolves.schedule, self.deer_habitats.get_habitats())
+        )
+
+    def show_replay_frame(self, index):
+        """Wyświetla zapisany stan wybrany na osi czasu (tylko przy zatrzymanej symulacji)."""
+        if self.simulation_started or index >= len(self.replay):
+            return
+
+        frame = self.replay.frame(index)
+        pack_positions = [(x, y) for _, x, y, _ in frame["packs"]]
+        wolf_count = [count for _, _, _, count in frame["packs"]]
+
+        self.gui_components.update_replay_label(frame["year"], frame["step"])
+        self.gui_components.update_year_counter(frame["year"])
+        self.gui_components.update_wolf_counter(sum(wolf_count))
+        self.draw(pack_positions, wolf_count, frame["deer"])
 
     def update_visualization(self):
         """Aktualizuje wizualizację na podstawie aktualnego stanu symulacji."""
         active_packs = self.wolves.schedule
         pack_positions = [(agent.x, agent.y) for agent in active_packs]
         wolf_count = [agent.wolf_count for agent in active_packs]
-
-        visualization_update(
+        self.draw(pack_positions, wolf_count, self.deer_habitats.get_habitats())
+        self.population_chart.update()
+
+    def draw(self, pack_positions, wolf_count, deer_habitats):
+        """Rysuje watahy i jelenie na powierzchni PyGame i przenosi obraz do GUI."""
+        # przy dużej liczbie watah tło z jeleniami i siatką jest kopiowane z pamięci podręcznej,
+        # a ikony i napisy rysowane zbiorczo
+        if len(pack_positions) > BATCHED_PACK_LIMIT:
+            update = visualization_update_batched
+        else:
+            update = visualization_update
+
+        update(
             self.pygame_screen,
             self.wolf_image,
             self.grid_size,
@@ -189,11 +434,13 @@ class Simulation:
             wolf_count,
             self.background_color,
             self.grid_color,
-            self.deer_habitats.get_habitats()
+            deer_habitats
         )
         self.gui_components.update_canvas_from_pygame(self.pygame_screen)
 
     def run(self):
         """Uruchamia aplikację."""
         self.app.exec_()
+        self.projection_executor.shutdown(wait=False, cancel_futures=True)
+        self.band_executor.shutdown(wait=False, cancel_futures=True)
 
@@ -0,0 +1,223 @@
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from core.cache import ResultCache, open_cache, result_key
+from core.runner import HeadlessSimulation
+
+# kwantyle raportowane dla każdego roku i kroku
+QUANTILES = (0.05, 0.5, 0.95)
+
+
+class RunningMoments:
+    """
+    Strumieniowa średnia i wariancja (algorytm Welforda).
+    Częściowe wyniki można łączyć metodą merge.
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+
+class QuantileSketch:
+    """
+    Szkic kwantyli dla wartości całkowitych (liczby wilków, watah, zabitych wilków).
+    Przechowuje histogram wartości, więc rozmiar zależy od zakresu wartości,
+    a nie od liczby obserwacji; dwa szkice łączy się przez zsumowanie histogramów.
+    """
+    def __init__(self):
+        self.histogram = Counter()
+        self.count = 0
+
+    def add(self, value, weight=1):
+        self.histogram[int(value)] += weight
+        self.count += weight
+
+    def merge(self, other):
+        self.histogram.update(other.histogram)
+        self.count += other.count
+
+    def quantile(self, q):
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for value in sorted(self.histogram):
+            seen += self.histogram[value]
+            if seen > rank:
+                return value
+        return max(self.histogram)
+
+
+class EnsembleAggregator:
+    """
+    Zbiera statystyki zespołu przebiegów dla każdego roku i kroku bez przechowywania trajektorii:
+    łączną liczbę wilków, liczbę zabitych wilków oraz rozkład wielkości watah.
+    """
+    METRICS = ("wolves", "killed", "pack_size")
+
+    def __init__(self):
+        self.stats = {}
+        self.replicas = 0
+
+    def _metric(self, year, step, metric):
+        key = (year, step)
+        if key not in self.stats:
+            self.stats[key] = {name: (RunningMoments(), QuantileSketch()) for name in self.METRICS}
+        return self.stats[key][metric]
+
+    def _add(self, year, step, metric, value):
+        moments, sketch = self._metric(year, step, metric)
+        moments.add(value)
+        sketch.add(value)
+
+    def observe(self, simulation):
+        """
+        Dodaje stan symulacji (HeadlessSimulation) po wykonaniu kroku.
+        """
+        self.add_row(trace_row(simulation))
+
+    def add_row(self, row):
+        """
+        Dodaje jeden krok zapisany jako [rok, krok, wilki, zabici, wielkości watah] (trace_row).
+        """
+        year, step, wolves, killed, pack_sizes = row
+        self._add(year, step, "wolves", wolves)
+        self._add(year, step, "killed", killed)
+        for pack_size in pack_sizes:
+            self._add(year, step, "pack_size", pack_size)
+
+    def merge(self, other):
+        """
+        Łączy wyniki częściowe, np. z innego procesu.
+        """
+        for key, metrics in other.stats.items():
+            for name, (moments, sketch) in metrics.items():
+                own_moments, own_sketch = self._metric(key[0], key[1], name)
+                own_moments.merge(moments)
+                own_sketch.merge(sketch)
+        self.replicas += other.replicas
+
+    def summary(self, metric="wolves"):
+        """
+        Zwraca słownik (rok, krok) -> średnia, wariancja i kwantyle 5/50/95 dla wybranej miary.
+        """
+        result = {}
+        for key in sorted(self.stats):
+            moments, sketch = self.stats[key][metric]
+            result[key] = {
+                "mean": moments.mean,
+                "variance": moments.variance(),
+                "quantiles": tuple(sketch.quantile(q) for q in QUANTILES),
+            }
+        return result
+
+
+def trace_row(simulation):
+    """
+    Zwraca stan symulacji po kroku jako [rok, krok, wilki, zabici, wielkości watah].
+    """
+    return [
+        simulation.current_year,
+        simulation.steps,
+        simulation.wolf_population.count_wolves(simulation.wolves),
+        simulation.last_killed,
+        sorted(agent.wolf_count for agent in simulation.wolves.schedule),
+    ]
+
+
+def aggregate_replicas(params, seeds, end_year=2020, steps_per_year=72, grid_size=20,
+                       movement_substeps=1, demography_interval=None, cache=None):
+    """
+    Uruchamia kolejne przebiegi w jednym procesie i zwraca ich zagregowane statystyki.
+    Przy podanym cache (ResultCache) przebieg każdej repliki z ziarnem jest zapisywany
+    krok po kroku (trace_row) i przy kolejnym wywołaniu odczytywany zamiast liczony.
+    """
+    schedule = {"movement_substeps": movement_substeps, "demography_interval": demography_interval}
+    aggregator = EnsembleAggregator()
+    for seed in seeds:
+        simulation = None
+        if cache is None or seed is None:
+            simulation = HeadlessSimulation(params, steps_per_year, grid_size, seed, **schedule)
+            aggregator.observe(simulation)
+            simulation.run(end_year, on_step=aggregator.observe)
+        else:
+            key = result_key(params, end_year, seed, steps_per_year, grid_size, **schedule, kind="replica")
+            trace = cache.get(key)
+            if trace is None:
+                simulation = HeadlessSimulation(params, steps_per_year, grid_size, seed, **schedule)
+                trace = [trace_row(simulation)]
+                simulation.run(end_year, on_step=lambda sim: trace.append(trace_row(sim)))
+                cache.put(key, trace)
+            for row in trace:
+                aggregator.add_row(row)
+        aggregator.replicas += 1
+    return aggregator
+
+
+def quantile_band(params, seeds, end_year=2020, steps_per_year=72, grid_size=20,
+                  movement_substeps=1, demography_interval=None):
+    """
+    Zwraca przedział 5-95% liczby wilków z zespołu przebiegów jako listę [rok, krok, dolny, górny].
+    """
+    aggregator = aggregate_replicas(params, seeds, end_year, steps_per_year, grid_size,
+                                    movement_substeps, demography_interval)
+    return [
+        [year, step, stats["quantiles"][0], stats["quantiles"][-1]]
+        for (year, step), stats in aggregator.summary("wolves").items()
+    ]
+
+
+def band_cached(params=None, end_year=2020, seeds=(0, 1, 2, 3), steps_per_year=72, grid_size=20, cache=None,
+                movement_substeps=1, demography_interval=None):
+    """
+    Zwraca przedział 5-95% liczby wilków (quantile_band) z pamięci podręcznej lub liczy go i zapisuje;
+    kluczem jest ten sam opis przebiegu co dla run_cached, z listą ziaren.
+    """
+    schedule = {"movement_substeps": movement_substeps, "demography_interval": demography_interval}
+    cache = cache or ResultCache()
+    key = result_key(params, end_year, list(seeds), steps_per_year, grid_size, **schedule, kind="band")
+    band = cache.get(key)
+    if band is None:
+        band = quantile_band(params, seeds, end_year, steps_per_year, grid_size, **schedule)
+        cache.put(key, band)
+    return band
+
+
+def run_ensemble(params, seeds, end_year=2020, workers=None, steps_per_year=72, grid_size=20, cache=True):
+    """
+    Rozdziela przebiegi między procesy i łączy ich częściowe statystyki w jeden wynik.
+    Przebiegi replik z ziarnem są zapisywane w pamięci podręcznej (domyślnie ResultCache(),
+    cache=False wyłącza ją), więc powtórzone zespoły nie są liczone ponownie.
+    """
+    cache = open_cache(cache)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(seeds)))
+    chunks = [seeds[i::workers] for i in range(workers)]
+
+    aggregator = EnsembleAggregator()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(aggregate_replicas, params, chunk, end_year, steps_per_year, grid_size, cache=cache)
+            for chunk in chunks
+        ]
+        for future in futures:
+            aggregator.merge(future.result())
+    return aggregator
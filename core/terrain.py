@@ -0,0 +1,156 @@
+import bisect
+import hashlib
+import os
+import random
+import numpy as np
+import pygame
+
+# warstwy terenu trzymane są obok wyników w ~/.cache/wolf_simulation (core.cache.CACHE_DIR)
+TERRAIN_DIR = os.path.join(os.path.expanduser("~"), ".cache", "wolf_simulation", "terrain")
+MAP_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "gui", "img", "map.png")
+# obszar wschodniej części Karpat (czerwona ramka na mapie), w pikselach map.png
+CARPATHIANS_REGION = (646, 746, 900, 877)
+# najmniejsza przydatność pola, aby żadne pole nie było całkowicie niedostępne
+MIN_SUITABILITY = 0.05
+
+# warstwy zapisywane w pliku .npy; wersja formatu jest częścią nazwy pliku
+SUITABILITY, COST, FLOW_X, FLOW_Y = range(4)
+FIELDS_VERSION = 3
+
+_terrains = {}
+
+
+def rasterize(path, cols, rows, region=None):
+    """
+    Wczytuje obraz i uśrednia go do siatki symulacji (cols x rows).
+    Ciemne piksele (lasy, obszary występowania wilków) mają wysoką przydatność, jasne i przezroczyste niską.
+    """
+    image = pygame.image.load(path)
+    rgb = pygame.surfarray.array3d(image).astype(np.float32)
+    if image.get_flags() & pygame.SRCALPHA:
+        alpha = pygame.surfarray.array_alpha(image).astype(np.float32) / 255
+    else:
+        alpha = np.ones(rgb.shape[:2], dtype=np.float32)
+
+    if region is not None:
+        x0, y0, x1, y1 = region
+        rgb, alpha = rgb[x0:x1, y0:y1], alpha[x0:x1, y0:y1]
+
+    darkness = (1 - rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32) / 255) * alpha
+
+    width, height = darkness.shape
+    cell_x = np.arange(width) * cols // width
+    cell_y = np.arange(height) * rows // height
+    totals = np.zeros((cols, rows), dtype=np.float32)
+    np.add.at(totals, (cell_x[:, None], cell_y[None, :]), darkness)
+    counts = np.bincount(cell_x, minlength=cols)[:, None] * np.bincount(cell_y, minlength=rows)[None, :]
+    grid = totals / counts
+
+    span = grid.max() - grid.min()
+    grid = (grid - grid.min()) / span if span > 0 else np.ones_like(grid)
+    return np.maximum(grid, MIN_SUITABILITY)
+
+
+def build_fields(suitability):
+    """
+    Wylicza z przydatności pól koszt przejścia przez pole oraz pole przepływu: krok -1/0/1
+    w każdej osi w kierunku lepszego siedliska, wyznaczony z gradientu przydatności.
+    """
+    cost = 1 / suitability
+    gradient_x, gradient_y = np.gradient(suitability)
+    flow_x = np.where(np.abs(gradient_x) > 0.05, np.sign(gradient_x), 0)
+    flow_y = np.where(np.abs(gradient_y) > 0.05, np.sign(gradient_y), 0)
+    return np.stack([suitability, cost, flow_x, flow_y]).astype(np.float32)
+
+
+class Terrain:
+    """
+    Siatka przydatności siedlisk i kosztu przejścia w rozdzielczości symulacji.
+    Wszystkie pola są wyliczone z góry, więc ruch agentów korzysta wyłącznie z odczytów O(1).
+    key identyfikuje źródło warstw (terrain_key) w kluczach pamięci podręcznej wyników;
+    teren bez klucza nie jest zapisywany w pamięci podręcznej.
+    """
+    def __init__(self, fields, key=None):
+        self.fields = fields
+        self.key = key
+        self.suitability = fields[SUITABILITY]
+        self.cost = fields[COST]
+        self.flow = (fields[FLOW_X], fields[FLOW_Y])
+        self.cols, self.rows = self.suitability.shape
+
+        # dystrybuanta do losowania pól proporcjonalnie do przydatności
+        self.cells = [(x, y) for x in range(self.cols) for y in range(self.rows)]
+        self.cumulative = np.cumsum(self.suitability, dtype=np.float64).tolist()
+
+    def suitability_at(self, x, y):
+        return float(self.suitability[x, y])
+
+    def flow_at(self, x, y):
+        return int(self.flow[0][x, y]), int(self.flow[1][x, y])
+
+    def random_cell(self, rng=random):
+        """
+        Losuje pole z prawdopodobieństwem proporcjonalnym do jego przydatności.
+        """
+        index = bisect.bisect_right(self.cumulative, rng.random() * self.cumulative[-1])
+        return self.cells[min(index, len(self.cells) - 1)]
+
+    def path_cost(self, x, y, move):
+        """
+        Zwraca koszt przejścia po prostej z (x, y) o wektor move: sumę kosztów mijanych pól
+        (bez pola startowego); pola poza siatką mają koszt najmniej przydatnego siedliska.
+        """
+        length = max(abs(move[0]), abs(move[1]))
+        step_x = (move[0] > 0) - (move[0] < 0)
+        step_y = (move[1] > 0) - (move[1] < 0)
+        total = 0.0
+        for i in range(1, length + 1):
+            cell_x, cell_y = x + i * step_x, y + i * step_y
+            if 0 <= cell_x < self.cols and 0 <= cell_y < self.rows:
+                total += self.cost[cell_x, cell_y]
+            else:
+                total += 1 / MIN_SUITABILITY
+        return total
+
+    def preference_order(self, moves, x, y, rng=random):
+        """
+        Zwraca ruchy w losowej kolejności ważonej odwrotnością średniego kosztu przejścia
+        (ważone losowanie bez zwracania). Dla kroku o jedno pole waga to przydatność pola docelowego,
+        a dłuższe skoki (ucieczka jeleni) omijają słabe siedliska po drodze.
+        """
+        def key(move):
+            weight = max(abs(move[0]), abs(move[1]), 1) / self.path_cost(x, y, move)
+            return rng.random() ** (1 / weight)
+
+        return sorted(moves, key=key, reverse=True)
+
+
+def terrain_key(cols, rows, path=MAP_PATH, region=CARPATHIANS_REGION):
+    """
+    Zwraca identyfikator terenu: skrót obrazu, rozdzielczość siatki, obszar i wersję formatu warstw.
+    """
+    with open(path, "rb") as file:
+        digest = hashlib.sha256(file.read()).hexdigest()[:16]
+    return f"{digest}_{cols}x{rows}_{'_'.join(map(str, region or ()))}_v{FIELDS_VERSION}"
+
+
+def load_terrain(cols, rows, path=MAP_PATH, region=CARPATHIANS_REGION, cache_dir=TERRAIN_DIR):
+    """
+    Zwraca teren dla siatki cols x rows. Warstwy są liczone raz dla danego obrazu i rozdzielczości,
+    zapisywane do pliku .npy i wczytywane jako tablica mapowana w pamięci; w obrębie procesu
+    ten sam teren jest współdzielony przez kolejne symulacje.
+    """
+    key = terrain_key(cols, rows, path, region)
+    fields_path = os.path.join(cache_dir, f"{key}.npy")
+    if fields_path in _terrains:
+        return _terrains[fields_path]
+
+    if not os.path.exists(fields_path):
+        os.makedirs(cache_dir, exist_ok=True)
+        fields = build_fields(rasterize(path, cols, rows, region))
+        tmp_path = f"{fields_path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, fields)
+        os.replace(tmp_path, fields_path)
+
+    _terrains[fields_path] = Terrain(np.load(fields_path, mmap_mode="r"), key)
+    return _terrains[fields_path]
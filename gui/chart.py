@@ -0,0 +1,142 @@
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtGui import QPainter, QPen, QColor, QPolygonF
+from PyQt5.QtCore import Qt, QPointF
+
+SERIES_COLOR = QColor(122, 51, 214)
+OBSERVED_COLOR = QColor(237, 111, 111)
+BAND_COLOR = QColor(185, 189, 237, 120)
+AXIS_COLOR = QColor(120, 120, 120)
+
+
+def lttb(points, threshold):
+    """
+    Zmniejsza liczbę punktów szeregu do threshold metodą Largest-Triangle-Three-Buckets,
+    zachowując pierwszy i ostatni punkt oraz kształt wykresu (lokalne minima i maksima).
+    """
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    previous = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        # średnia kolejnego kubełka jako trzeci wierzchołek trójkąta
+        next_start, next_end = end, min(int((i + 2) * bucket_size) + 1, len(points))
+        next_bucket = points[next_start:next_end]
+        average_x = sum(x for x, _ in next_bucket) / len(next_bucket)
+        average_y = sum(y for _, y in next_bucket) / len(next_bucket)
+
+        point_x, point_y = points[previous]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((point_x - average_x) * (y - point_y) - (point_x - x) * (average_y - point_y))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        previous = best
+
+    sampled.append(points[-1])
+    return sampled
+
+
+class PopulationChart(QWidget):
+    """
+    Wykres liczby wilków w czasie na tle obserwacji avg_pop.
+    Punkty są tylko dopisywane; gdy bufor przekroczy dwukrotność szerokości wykresu, jest on
+    zmniejszany o połowę metodą LTTB, więc dopisanie punktu kosztuje zamortyzowane O(1),
+    a rysowanie zależy od szerokości wykresu, a nie od liczby kroków.
+    Opcjonalnie rysowany jest przedział 5-95% z zespołu przebiegów (EnsembleAggregator).
+    """
+    def __init__(self, parent=None, first_year=2000, last_year=2020):
+        super().__init__(parent)
+        self.first_year = first_year
+        self.last_year = last_year
+        self.observed = []
+        self.band = []
+        self.points = []
+        self.max_value = 0
+
+    def max_points(self):
+        return max(2 * self.width(), 16)
+
+    def clear(self, year=None, value=None):
+        """Usuwa zapisany szereg; opcjonalnie zaczyna go od punktu (year, value)."""
+        self.points = []
+        self.max_value = 0
+        if year is not None:
+            self.add(year, value)
+
+    def add(self, time, value):
+        """Dopisuje punkt szeregu (czas w latach, liczba wilków)."""
+        self.points.append((time, value))
+        self.max_value = max(self.max_value, value)
+        if len(self.points) > self.max_points():
+            self.points = lttb(self.points, self.max_points() // 2)
+
+    def set_observed(self, years, values):
+        """Ustawia obserwowane liczebności (punkty na wykresie)."""
+        self.observed = list(zip(years, values))
+        self.update()
+
+    def set_band(self, rows, steps_per_year):
+        """
+        Ustawia przedział ufności z wierszy [rok, krok, dolny, górny] (core.statistics.quantile_band)
+        albo usuwa go, jeśli rows to None. Przedział jest zagęszczany do szerokości wykresu.
+        """
+        self.band = []
+        if rows:
+            band = [
+                (year + (step + 1) / steps_per_year, low, high)
+                for year, step, low, high in sorted(rows, key=lambda row: (row[0], row[1]))
+            ]
+            bucket = max(1, len(band) // max(self.width(), 1))
+            for i in range(0, len(band), bucket):
+                chunk = band[i:i + bucket]
+                self.band.append((chunk[0][0], min(low for _, low, _ in chunk), max(high for _, _, high in chunk)))
+        self.update()
+
+    def paintEvent(self, event):
+        points, band = self.points, self.band
+        margin = 30
+        width, height = self.width() - 2 * margin, self.height() - 2 * margin
+        last_year = max(self.last_year, points[-1][0] if points else self.last_year)
+        top = max([self.max_value] + [value for _, value in self.observed] + [high for _, _, high in band]) * 1.1
+        top = max(top, 1)
+
+        def to_screen(time, value):
+            x = margin + (time - self.first_year) / (last_year - self.first_year) * width
+            return QPointF(x, margin + height - value / top * height)
+
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        # osie z opisem lat i maksymalnej wartości
+        painter.setPen(QPen(AXIS_COLOR, 1))
+        painter.drawLine(margin, margin + height, margin + width, margin + height)
+        painter.drawLine(margin, margin, margin, margin + height)
+        painter.drawText(margin, self.height() - 8, str(self.first_year))
+        painter.drawText(margin + width - 30, self.height() - 8, str(int(last_year)))
+        painter.drawText(2, margin - 8, str(int(top)))
+
+        if band:
+            polygon = QPolygonF(
+                [to_screen(time, high) for time, _, high in band]
+                + [to_screen(time, low) for time, low, _ in reversed(band)]
+            )
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(BAND_COLOR)
+            painter.drawPolygon(polygon)
+
+        if len(points) > 1:
+            painter.setPen(QPen(SERIES_COLOR, 2))
+            painter.drawPolyline(QPolygonF([to_screen(time, value) for time, value in points]))
+
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(OBSERVED_COLOR)
+        for year, value in self.observed:
+            painter.drawEllipse(to_screen(year, value), 4, 4)
+        painter.end()
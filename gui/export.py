@@ -0,0 +1,140 @@
+import argparse
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+import pygame
+from core.recording import load_recording
+from gui.visualization import (
+    BATCHED_PACK_LIMIT, visualization_init, visualization_update, visualization_update_batched,
+)
+
+_worker = {}
+
+
+def _init_worker():
+    """
+    Przygotowuje w procesie roboczym powierzchnię i ikonę wilka (raz na proces).
+    """
+    surface, wolf_image, grid_color, background_color = visualization_init()
+    _worker.update(surface=surface, wolf_image=wolf_image, grid_color=grid_color,
+                   background_color=background_color, font=pygame.font.Font(None, 24))
+
+
+def render_frame(frame, grid_size, caption=True):
+    """
+    Rysuje jeden zapisany krok tak samo jak wizualizacja w GUI i zwraca powierzchnię.
+    """
+    if not _worker:
+        _init_worker()
+    surface = _worker["surface"]
+
+    packs = frame["packs"]
+    pack_positions = [(x, y) for _, x, y, _ in packs]
+    wolf_count = [count for _, _, _, count in packs]
+    update = visualization_update_batched if len(packs) > BATCHED_PACK_LIMIT else visualization_update
+    update(surface, _worker["wolf_image"], grid_size, pack_positions, wolf_count,
+           _worker["background_color"], _worker["grid_color"], frame["deer"])
+
+    if caption:
+        text = f"Year: {frame['year']}   Wolf count: {sum(wolf_count)}"
+        surface.blit(_worker["font"].render(text, True, (0, 0, 0)), (10, 10))
+    return surface
+
+
+def _render_png_chunk(indexed_frames, grid_size, directory, caption):
+    paths = []
+    for index, frame in indexed_frames:
+        path = os.path.join(directory, f"frame_{index:05d}.png")
+        pygame.image.save(render_frame(frame, grid_size, caption), path)
+        paths.append(path)
+    return paths
+
+
+def _render_gif_chunk(indexed_frames, grid_size, caption):
+    from PIL import Image
+
+    # kwantyzacja do palety odbywa się w procesach roboczych,
+    # a klatki są kompresowane przed przesłaniem do procesu głównego
+    frames = []
+    for _, frame in indexed_frames:
+        surface = render_frame(frame, grid_size, caption)
+        image = Image.frombytes("RGB", surface.get_size(), pygame.image.tostring(surface, "RGB"))
+        image = image.quantize(colors=64, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+        frames.append((image.size, zlib.compress(image.tobytes(), 1), image.getpalette()))
+    return frames
+
+
+def _chunks(frames, workers):
+    indexed = list(enumerate(frames))
+    size = max(1, -(-len(indexed) // (workers * 4)))
+    return [indexed[i:i + size] for i in range(0, len(indexed), size)]
+
+
+def export_frames(recording, directory, workers=None, caption=True):
+    """
+    Renderuje wszystkie kroki nagrania równolegle do numerowanych plików PNG.
+    Zwraca listę ścieżek w kolejności kroków.
+    """
+    os.makedirs(directory, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunks(recording["frames"], workers)
+
+    paths = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = [
+            executor.submit(_render_png_chunk, chunk, recording["grid_size"], directory, caption)
+            for chunk in chunks
+        ]
+        for future in futures:
+            paths.extend(future.result())
+    return paths
+
+
+def export_animation(recording, path, workers=None, frame_duration=50, caption=True):
+    """
+    Renderuje nagranie równolegle i zapisuje je jako jeden animowany plik (np. GIF).
+    Wymaga biblioteki Pillow.
+    """
+    try:
+        from PIL import Image
+    except ImportError as error:
+        raise ImportError("Exporting animations requires Pillow (pip install Pillow).") from error
+
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunks(recording["frames"], workers)
+
+    frames = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = [executor.submit(_render_gif_chunk, chunk, recording["grid_size"], caption) for chunk in chunks]
+        for future in futures:
+            frames.extend(future.result())
+
+    def images():
+        for size, data, palette in frames:
+            image = Image.frombytes("P", size, zlib.decompress(data))
+            image.putpalette(palette)
+            yield image
+
+    sequence = images()
+    next(sequence).save(path, save_all=True, append_images=sequence, duration=frame_duration, loop=0,
+                        optimize=False)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a recorded simulation run to frames or an animation.")
+    parser.add_argument("recording", help="recording file created with core.recording.save_recording")
+    parser.add_argument("output", help="directory for PNG frames, or a .gif file")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-caption", action="store_true")
+    args = parser.parse_args()
+
+    recording = load_recording(args.recording)
+    if args.output.lower().endswith(".gif"):
+        export_animation(recording, args.output, args.workers, caption=not args.no_caption)
+    else:
+        export_frames(recording, args.output, args.workers, caption=not args.no_caption)
+
+
+if __name__ == "__main__":
+    main()
